@@ -0,0 +1,190 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Closed: calls go through. Open: calls are skipped until cooldown_seconds have passed.
+# Half-open: one trial call is let through; success closes the breaker, failure re-opens it.
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold=3, cooldown_seconds=60):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                self.state = "half_open"
+            if self.state == "half_open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.trial_in_flight = False
+
+    def release(self):
+        # The trial ended without an outcome (e.g. the caller stopped reading a stream); let another one through
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"🔌 Circuit opened for {self.cooldown_seconds}s after {self.consecutive_failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+# Runs a remote (OpenAI) generation with a local (LaMini) fallback. The remote call is skipped
+# while its circuit is open; with hedge_after_seconds set, the local model is started as soon
+# as the remote call exceeds that budget and whichever finishes first wins.
+class BackendManager:
+
+    def __init__(self, remote, local, remote_async=None, breaker=None, hedge_after_seconds=0):
+        self.remote = remote
+        self.local = local
+        self.remote_async = remote_async
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge_after_seconds = hedge_after_seconds
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="genai-backend")
+        self.counters = {
+            "remote_calls": 0, "remote_failures": 0, "fallbacks": 0,
+            "skipped_open_circuit": 0, "hedges": 0, "hedge_local_wins": 0,
+        }
+        self.lock = threading.Lock()
+
+    def generate(self, prompt, **kwargs):
+        return self.answer(prompt, **kwargs)[0]
+
+    async def agenerate(self, prompt, **kwargs):
+        return (await self.aanswer(prompt, **kwargs))[0]
+
+    def answer(self, prompt, **kwargs):
+        # (text, "remote" or "local"), so callers can tell a fallback answer apart
+        if not self.breaker.allow():
+            self._count("skipped_open_circuit", "fallbacks")
+            return self.local(prompt), "local"
+
+        self._count("remote_calls")
+        if not self.hedge_after_seconds:
+            try:
+                return self._remote_call(prompt, **kwargs), "remote"
+            except Exception as e:
+                print(f"⚠️ Remote backend failed: {e}")
+                print("⏪ Falling back to Hugging Face model...")
+                self._count("fallbacks")
+                return self.local(prompt), "local"
+
+        remote = self.executor.submit(self._remote_call, prompt, **kwargs)
+        done, _ = wait([remote], timeout=self.hedge_after_seconds)
+        if remote in done and remote.exception() is None:
+            return remote.result(), "remote"
+
+        local = None
+        if remote not in done:
+            self._count("hedges")
+            local = self.executor.submit(self.local, prompt)
+            done, _ = wait([remote, local], return_when=FIRST_COMPLETED)
+            if remote in done and remote.exception() is None:
+                return remote.result(), "remote"
+        if remote.done() and remote.exception() is not None:
+            print(f"⚠️ Remote backend failed: {remote.exception()}")
+        self._count("fallbacks")
+        if local is not None and not remote.done():
+            self._count("hedge_local_wins")
+        return (local or self.executor.submit(self.local, prompt)).result(), "local"
+
+    async def aanswer(self, prompt, **kwargs):
+        loop = asyncio.get_running_loop()
+        if not self.breaker.allow():
+            self._count("skipped_open_circuit", "fallbacks")
+            return await loop.run_in_executor(self.executor, self.local, prompt), "local"
+
+        self._count("remote_calls")
+        remote = asyncio.ensure_future(self._aremote_call(prompt, **kwargs))
+        # A hedged-away remote call may fail after we stopped waiting; mark its exception as seen
+        remote.add_done_callback(lambda task: task.cancelled() or task.exception())
+        if self.hedge_after_seconds:
+            done, _ = await asyncio.wait({remote}, timeout=self.hedge_after_seconds)
+            if not done:
+                self._count("hedges")
+                local = loop.run_in_executor(self.executor, self.local, prompt)
+                done, _ = await asyncio.wait({remote, local}, return_when=asyncio.FIRST_COMPLETED)
+                if remote in done and remote.exception() is None:
+                    return remote.result(), "remote"
+                self._count("fallbacks")
+                if not remote.done():
+                    self._count("hedge_local_wins")
+                return await local, "local"
+        try:
+            return await remote, "remote"
+        except Exception as e:
+            print(f"⚠️ Remote backend failed: {e}")
+            print("⏪ Falling back to Hugging Face model...")
+            self._count("fallbacks")
+            return await loop.run_in_executor(self.executor, self.local, prompt), "local"
+
+    def record_hedge(self):
+        # A streamed answer that switched to the local model because the remote one was too slow to start
+        self._count("hedges", "fallbacks", "hedge_local_wins")
+
+    def record_fallback(self, skipped_open_circuit=False):
+        self._count(*(("skipped_open_circuit", "fallbacks") if skipped_open_circuit else ("fallbacks",)))
+
+    def record(self, success):
+        # For callers that drive the remote backend themselves (e.g. streaming)
+        if success:
+            self.breaker.record_success()
+        else:
+            self._count("remote_failures")
+            self.breaker.record_failure()
+
+    def release(self):
+        # For callers that abandon a remote call before it succeeds or fails
+        self.breaker.release()
+
+    def health(self):
+        with self.lock:
+            counters = dict(self.counters)
+        counters.update({
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "healthy": self.breaker.state == "closed",
+        })
+        return counters
+
+    def _remote_call(self, prompt, **kwargs):
+        try:
+            result = self.remote(prompt, **kwargs)
+        except Exception:
+            self.record(False)
+            raise
+        self.record(True)
+        return result
+
+    async def _aremote_call(self, prompt, **kwargs):
+        try:
+            result = await self.remote_async(prompt, **kwargs)
+        except Exception:
+            self.record(False)
+            raise
+        self.record(True)
+        return result
+
+    def _count(self, *names):
+        with self.lock:
+            for name in names:
+                self.counters[name] += 1
@@ -0,0 +1,117 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from app.model_registry import LazyModel, get_model
+
+MAX_BATCH_SIZE = int(os.getenv("IPE_BATCH_MAX_SIZE", "16"))
+MAX_WAIT_MS = float(os.getenv("IPE_BATCH_MAX_WAIT_MS", "10"))
+
+# Collects single items submitted from many threads (Streamlit sessions, inference server
+# requests) and runs them through fn as one batch once max_batch_size items are waiting or
+# max_wait_ms has passed since the first one arrived. fn(items) must return one result per item.
+class MicroBatcher:
+
+    def __init__(self, fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, name="batcher"):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.worker = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self.worker.start()
+
+    def submit(self, item):
+        future = Future()
+        self.queue.put((item, future))
+        return future
+
+    def map(self, items):
+        futures = [self.submit(item) for item in items]
+        return [future.result() for future in futures]
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            items = [item for item, _ in batch]
+            try:
+                results = self.fn(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+def _batcher(key, fn):
+    with _batchers_lock:
+        if key not in _batchers:
+            _batchers[key] = MicroBatcher(fn, name=":".join(str(k) for k in key[:2]))
+        return _batchers[key]
+
+def batcher_stats():
+    with _batchers_lock:
+        return {":".join(str(k) for k in key[:2]): b.stats() for key, b in _batchers.items()}
+
+# Lazy model whose pipeline calls and encode() go through a shared micro-batcher. Calls that
+# already carry a full batch (e.g. re-encoding the incident corpus) skip the queue.
+class BatchedModel(LazyModel):
+
+    def __call__(self, inputs, **kwargs):
+        single = isinstance(inputs, str)
+        items = [inputs] if single else list(inputs)
+        if MAX_BATCH_SIZE <= 1 or not 0 < len(items) < MAX_BATCH_SIZE:
+            return get_model(self.name)(inputs, **kwargs)
+
+        def run(batch):
+            # kwargs may already carry batch_size (a client-side batcher forwarding to the server)
+            return get_model(self.name)(batch, **dict(kwargs, batch_size=len(batch)))
+
+        key = (self.name, "pipeline", tuple(sorted((k, repr(v)) for k, v in kwargs.items() if k != "batch_size")))
+        return _batcher(key, run).map(items)
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        single = isinstance(texts, str)
+        items = [texts] if single else list(texts)
+        if MAX_BATCH_SIZE <= 1 or not 0 < len(items) < MAX_BATCH_SIZE:
+            return get_model(self.name).encode(texts, **dict(kwargs, convert_to_numpy=True))
+
+        def run(batch):
+            return list(get_model(self.name).encode(batch, **dict(kwargs, batch_size=len(batch), convert_to_numpy=True)))
+
+        key = (self.name, "encode", tuple(sorted((k, repr(v)) for k, v in kwargs.items() if k != "batch_size")))
+        embeddings = _batcher(key, run).map(items)
+        return embeddings[0] if single else np.stack(embeddings)
+
+_batched_models = {}
+
+def batched_model(name):
+    return _batched_models.setdefault(name, BatchedModel(name))
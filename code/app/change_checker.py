@@ -1,14 +1,56 @@
 
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from app.data_loader import PARSED_DATES, cached_table, parsed_dates
 
 def load_cmdb(cmdb_path):
-    return pd.read_csv(cmdb_path)
+    return cached_table(cmdb_path, "cmdb")
 
 def load_changes(change_path):
-    return pd.read_csv(change_path)
+    return cached_table(change_path, "changes")
 
-def get_related_changes(app, incident_date, change_df):
+# Change requests grouped per app and sorted by date, with dates parsed once. A lookup for
+# "app X, on or before t (optionally within window_days)" is two binary searches.
+class ChangeIndex:
+
+    def __init__(self, change_df):
+        self.change_df = change_df
+        dates = parsed_dates(change_df, "date")
+        valid = ~np.isnat(dates)
+        records = change_df.drop(columns=[c for c in PARSED_DATES.values() if c in change_df]).to_dict(orient="records")
+        self.by_app = {}
+        for app, positions in pd.Series(np.flatnonzero(valid)).groupby(change_df["app"].values[valid]):
+            positions = positions.to_numpy()
+            # Date ascending, same-day changes in reverse file order, so reading from the end
+            # gives nearest first with ties in file order
+            order = np.lexsort((-positions, dates[positions]))
+            self.by_app[app] = (dates[positions][order], [records[i] for i in positions[order]])
+
+    def __len__(self):
+        return len(self.change_df)
+
+    def related(self, app, incident_date, window_days=None):
+        # Changes for app in [incident_date - window_days, incident_date], nearest first, each with
+        # days_diff (days between the change and the incident) as its correlation distance
+        try:
+            incident_day = np.datetime64(datetime.strptime(incident_date, "%Y-%m-%d").date(), "D")
+        except (TypeError, ValueError):
+            return []
+        if app not in self.by_app:
+            return []
+        dates, records = self.by_app[app]
+        end = np.searchsorted(dates, incident_day, side="right")
+        start = 0 if window_days is None else np.searchsorted(dates, incident_day - np.timedelta64(window_days, "D"))
+        days = (incident_day - dates[start:end]).astype(int)
+        return [dict(records[i], days_diff=int(d)) for i, d in zip(range(end - 1, start - 1, -1), days[::-1])]
+
+def build_change_index(change_df):
+    return ChangeIndex(change_df)
+
+def get_related_changes(app, incident_date, change_df, window_days=None):
+    if isinstance(change_df, ChangeIndex):
+        return change_df.related(app, incident_date, window_days)
     try:
         incident_dt = datetime.strptime(incident_date, "%Y-%m-%d")
     except:
@@ -0,0 +1,164 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app.data_loader import parsed_dates
+
+CORRELATION_DB = "data/.cache/change_correlation.sqlite"
+TOP_CHANGES = 5
+# Bump when the stored rows would come out differently, so existing tables are recomputed
+CORRELATION_VERSION = 1
+
+def correlation_status(days_diff, cr_number, selected_cr):
+    # An incident that names its CR correlates strongly with that CR only; otherwise proximity decides
+    if selected_cr:
+        return '🔴 Strong correlation' if cr_number == selected_cr else '🟠 Partial correlation'
+    return '🟢 All clear' if days_diff > 3 else ('🟠 Partial correlation' if days_diff > 1 else '🔴 Strong correlation')
+
+def correlate_incidents(incident_df, change_index, top_n=TOP_CHANGES):
+    # One pass per app: an as-of search of every incident date into the app's sorted change dates.
+    # Returns (counts, links): related-change count per incident, and its top_n nearest prior CRs.
+    dates = parsed_dates(incident_df, "incident_date")
+    incident_ids = incident_df["incident_id"].to_numpy()
+    selected = incident_df["cr_number"].fillna("").astype(str).to_numpy()
+    counts = np.zeros(len(incident_df), dtype=np.int64)
+    links = []
+
+    for app, positions in pd.Series(np.arange(len(incident_df))).groupby(incident_df["app"].values):
+        positions = positions.to_numpy()
+        positions = positions[~np.isnat(dates[positions])]
+        if app not in change_index.by_app or not len(positions):
+            continue
+        change_dates, records = change_index.by_app[app]
+        cr_numbers = np.array([r["cr_number"] for r in records], dtype=object)
+
+        end = np.searchsorted(change_dates, dates[positions], side="right")
+        counts[positions] = end
+        ranks = np.arange(top_n)
+        idx = end[:, None] - 1 - ranks  # nearest prior change first
+        rows, cols = np.nonzero(idx >= 0)
+        picked = idx[rows, cols]
+        days = (dates[positions][rows] - change_dates[picked]).astype(int)
+        links.append(pd.DataFrame({
+            "incident_id": incident_ids[positions][rows],
+            "rank": cols + 1,
+            "cr_number": cr_numbers[picked],
+            "app": app,
+            "cr_date": change_dates[picked].astype(str),
+            "days_diff": days,
+            "selected_cr": selected[positions][rows],
+        }))
+
+    links = pd.concat(links, ignore_index=True) if links else pd.DataFrame(
+        columns=["incident_id", "rank", "cr_number", "app", "cr_date", "days_diff", "selected_cr"])
+    links["status"] = [correlation_status(d, c, s) for d, c, s in zip(links["days_diff"], links["cr_number"], links["selected_cr"])]
+    counts = pd.DataFrame({"incident_id": incident_ids, "related_count": counts})
+    return counts, links.drop(columns="selected_cr")
+
+# Incident <-> change correlations for the whole incident table, kept in SQLite with indexes on
+# incident and CR. update() only recomputes incidents that are new or edited, plus incidents of
+# apps whose change history changed on or before their date.
+class CorrelationTable:
+
+    def __init__(self, path=CORRELATION_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS incidents (
+                incident_id TEXT PRIMARY KEY, app TEXT, incident_date TEXT, cr_number TEXT, related_count INTEGER);
+            CREATE TABLE IF NOT EXISTS correlations (
+                incident_id TEXT, rank INTEGER, cr_number TEXT, app TEXT, cr_date TEXT, days_diff INTEGER, status TEXT,
+                PRIMARY KEY (incident_id, rank));
+            CREATE INDEX IF NOT EXISTS correlations_by_cr ON correlations (cr_number);
+            CREATE TABLE IF NOT EXISTS changes (cr_number TEXT, app TEXT, date TEXT);
+        """)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != CORRELATION_VERSION:
+            with self.db:
+                self.db.executescript("DELETE FROM incidents; DELETE FROM correlations; DELETE FROM changes;")
+                self.db.execute(f"PRAGMA user_version = {CORRELATION_VERSION}")
+
+    def update(self, incident_df, change_index):
+        # Returns the number of incidents (re)correlated
+        incidents = incident_df[["incident_id", "app", "incident_date", "cr_number"]].fillna("").astype(str)
+        changes = change_index.change_df[["cr_number", "app", "date"]].fillna("").astype(str)
+        with self.lock:
+            stored = pd.read_sql("SELECT incident_id, app, incident_date, cr_number FROM incidents", self.db)
+            stored_changes = pd.read_sql("SELECT cr_number, app, date FROM changes", self.db)
+
+            merged = incidents.merge(stored, how="left", on="incident_id", suffixes=("", "_old"), indicator=True)
+            dirty = (merged["_merge"] == "left_only") | (merged["app"] != merged["app_old"]) \
+                | (merged["incident_date"] != merged["incident_date_old"]) | (merged["cr_number"] != merged["cr_number_old"])
+            removed = set(stored["incident_id"]) - set(incidents["incident_id"])
+
+            # Changes added or removed since the last run move the as-of window of later incidents of their app
+            diff = changes.merge(stored_changes, how="outer", indicator=True)
+            diff = diff[diff["_merge"] != "both"]
+            earliest = pd.to_datetime(diff["date"], errors="coerce").groupby(diff["app"]).min()
+            incident_dates = pd.to_datetime(incidents["incident_date"], errors="coerce")
+            for app, since in earliest.items():
+                affected = incidents["app"] == app
+                if not pd.isna(since):
+                    affected &= incident_dates >= since
+                dirty |= affected.to_numpy()
+
+            todo = incident_df[dirty.to_numpy()]
+            stale = list(removed) + todo["incident_id"].astype(str).tolist()
+            counts, links = correlate_incidents(todo, change_index)
+            counts = counts.merge(incidents, on="incident_id")
+
+            with self.db:
+                self.db.executemany("DELETE FROM incidents WHERE incident_id = ?", [(i,) for i in stale])
+                self.db.executemany("DELETE FROM correlations WHERE incident_id = ?", [(i,) for i in stale])
+                self.db.executemany(
+                    "INSERT INTO incidents VALUES (?, ?, ?, ?, ?)",
+                    counts[["incident_id", "app", "incident_date", "cr_number", "related_count"]].itertuples(index=False),
+                )
+                self.db.executemany(
+                    "INSERT INTO correlations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    links[["incident_id", "rank", "cr_number", "app", "cr_date", "days_diff", "status"]]
+                    .astype({"rank": int, "days_diff": int}).itertuples(index=False),
+                )
+                if len(diff):
+                    self.db.execute("DELETE FROM changes")
+                    self.db.executemany("INSERT INTO changes VALUES (?, ?, ?)", changes.itertuples(index=False))
+        if len(todo):
+            print(f"🔗 Correlated {len(todo)} incidents with change requests")
+        return len(todo)
+
+    def copy(self):
+        # Point-in-time copy in memory, for readers that must not see later updates
+        table = CorrelationTable(":memory:")
+        with self.lock:
+            self.db.backup(table.db)
+        return table
+
+    def related(self, incident_id):
+        # Top prior CRs for an incident, nearest first, with days_diff and correlation status
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT cr_number, app, cr_date, days_diff, status FROM correlations WHERE incident_id = ? ORDER BY rank",
+                (incident_id,),
+            ).fetchall()
+        return [dict(zip(("cr_number", "app", "date", "days_diff", "status"), row)) for row in rows]
+
+    def related_count(self, incident_id):
+        with self.lock:
+            row = self.db.execute("SELECT related_count FROM incidents WHERE incident_id = ?", (incident_id,)).fetchone()
+        return row[0] if row else 0
+
+    def top_changes(self, limit=10):
+        # Fleet-wide: which CRs show up as strongest suspects for the most incidents
+        with self.lock:
+            return pd.read_sql("""
+                SELECT cr_number, app, cr_date,
+                       SUM(status LIKE '%Strong%') AS strong_incidents,
+                       SUM(status LIKE '%Partial%') AS partial_incidents,
+                       COUNT(*) AS linked_incidents
+                FROM correlations
+                GROUP BY cr_number, app, cr_date
+                ORDER BY strong_incidents DESC, linked_incidents DESC
+                LIMIT ?""", self.db, params=(limit,))
@@ -1,10 +1,11 @@
 # 📁 File: app/chatbot_router.py
-from app.model_runner import generate_root_cause_analysis, generate_genai_response, describe_network, suggest_missing_connections
-from app.log_checker import get_logs_for_trace_id, summarize_logs
+from app.model_runner import generate_root_cause_analysis, generate_genai_response, describe_network, suggest_missing_connections, stream_root_cause_analysis, stream_genai_response
+from app.log_checker import get_logs_for_trace_id, search_logs, summarize_logs
 from app.change_checker import get_related_changes
 from app.vector_search import retrieve_similar_incidents
 from app.network_viz import generate_dot
 from app.intelscope import query_entry
+from app.entity_store import build_entity_store
 import pandas as pd
 import re
 
@@ -18,12 +19,48 @@ def extract_uuid(text):
     match = re.search(r"[a-f0-9]{8}-[a-f0-9]{4}-[1-5][a-f0-9]{3}-[89ab][a-f0-9]{3}-[a-f0-9]{12}", text, re.I)
     return match.group(0) if match else None
 
-def process_chatbot_query(query, df, model, index, logs_df, change_df, cmdb_df, network_data ,chat_history=None, kb_doc_id=None):
+# With stream=True the GenAI routes return a token generator instead of a finished string
+def rca_answer(query, similar, stream=False):
+    return stream_root_cause_analysis(query, similar) if stream else generate_root_cause_analysis(query, similar)
+
+def genai_answer(prompt, network_data, stream=False):
+    return stream_genai_response(prompt, network_data) if stream else generate_genai_response(prompt, network_data)
+
+def related_change_count(row, change_df, correlations=None):
+    # Precomputed correlation table when available, otherwise an on-the-fly lookup
+    if correlations is not None:
+        return correlations.related_count(row["incident_id"])
+    return len(get_related_changes(row["app"], row["incident_date"], change_df))
+
+# "which traces mention "connection reset" on DBG in the last 10": full-text search over the log store,
+# optionally limited to the traces of one app's incidents and to the N most recent traces
+def log_search_answer(text, query, entities, logs_df):
+    phrase = re.search(r'"([^"]+)"', text)
+    terms = f'"{phrase.group(1)}"' if phrase else re.split(r"\s+(?:on|in the last|for app)\b", text)[0].strip(" ?.`'")
+    last = re.search(r"last\s+(\d+)", query, re.I)
+    limit = int(last.group(1)) if last else 20
+    app_name = extract_app_name(query, entities.incident_apps)
+    trace_ids = entities.traces_for_app(app_name) if app_name else None
+
+    matches = search_logs(terms, logs_df, limit=limit, trace_ids=trace_ids)
+    scope = f" on {app_name}" if app_name else ""
+    if not matches:
+        return f"No traces{scope} mention {terms}."
+    lines = [f"🔎 {len(matches)} trace(s){scope} mention {terms}:"]
+    for trace_id, hits in matches.items():
+        more = f" (+{len(hits) - 1} more)" if len(hits) > 1 else ""
+        lines.append(f"- `{trace_id}`: {hits[0]}{more}")
+    return "\n".join(lines)
+
+def process_chatbot_query(query, df, model, index, logs_df, change_df, cmdb_df, network_data ,chat_history=None, kb_doc_id=None, stream=False, correlations=None, entities=None):
     if not query.strip():
         return "🤖 Please enter a question so I can help!"
 
+    # Callers that keep an entity store get O(1) lookups; otherwise index the tables for this query
+    entities = entities or build_entity_store(df, cmdb_df, network_data)
+    network_data = entities.network
     query_lower = query.lower()
-    all_apps = [entry["app"] for entry in network_data]
+    all_apps = entities.network.by_app
 
     if any(keyword in query_lower for keyword in ["diagram", "architecture", "design"]):
         unknown_targets = check_unknown_targets(query, all_apps)
@@ -37,24 +74,28 @@ def process_chatbot_query(query, df, model, index, logs_df, change_df, cmdb_df,
             return "Please mention a valid system name to generate the architecture diagram."
     if "root cause" in query_lower or "analysis" in query_lower or "rca" in query_lower:
         similar = retrieve_similar_incidents(query, model, index, df)
-        return generate_root_cause_analysis(query, similar)
+        return rca_answer(query, similar, stream)
     
     if "incident" in query_lower and "inc" in query_lower:
         # Try to extract incident ID
         inc_id = next((word for word in query.split() if word.startswith("INC")), None)
-        if inc_id and inc_id in df["incident_id"].values:
-            row = df[df["incident_id"] == inc_id].iloc[0]
-            changes = get_related_changes(row["app"], row["incident_date"], change_df)
-            return f"Incident {inc_id}:\nDescription: {row['description']}\nCause: {row['cause']}\nResolution: {row['resolution']}\nRelated Changes: {len(changes)}"
+        if inc_id and entities.has_incident(inc_id):
+            row = entities.incident(inc_id)
+            changes = related_change_count(row, change_df, correlations)
+            return f"Incident {inc_id}:\nDescription: {row['description']}\nCause: {row['cause']}\nResolution: {row['resolution']}\nRelated Changes: {changes}"
         else:
             return "Incident ID not found."
         
     
+    search = re.search(r"\b(?:mentions?|mentioning|containing|search logs for)\s+(.+)", query, re.I)
+    if search and ("trace" in query_lower or "log" in query_lower) and not extract_uuid(query):
+        return log_search_answer(search.group(1), query, entities, logs_df)
+
     if "trace" in query_lower or "log" in query_lower or extract_uuid(query):
         trace_id = extract_uuid(query) or next((word for word in query.split() if word.startswith("trace") or word.startswith("log")), None)
         logs = get_logs_for_trace_id(trace_id, logs_df)
         if logs:
-            summary = summarize_logs(logs)
+            summary = summarize_logs(logs, trace_id)
             return "\n".join(summary)
         else:
             return "No logs found for that trace ID."
@@ -83,28 +124,28 @@ def process_chatbot_query(query, df, model, index, logs_df, change_df, cmdb_df,
                             return "Please mention a valid system name to generate the architecture diagram."
                     if any(k in recent_context.lower() for k in ["root cause","analysis","rca"]):
                         similar = retrieve_similar_incidents(query, model, index, df)
-                        return generate_root_cause_analysis(query, similar)
+                        return rca_answer(query, similar, stream)
                     
 
                     if any(k in recent_context.lower() for k in ["incident", "inc"]):
                         inc_id = next((word for word in recent_context.split() if word.startswith("INC")), None)
-                        if inc_id and inc_id in df["incident_id"].values:
-                            row = df[df["incident_id"] == inc_id].iloc[0]
-                            changes = get_related_changes(row["app"], row["incident_date"], change_df)
-                            return f"Incident {inc_id}:\nDescription: {row['description']}\nCause: {row['cause']}\nResolution: {row['resolution']}\nRelated Changes: {len(changes)}"
+                        if inc_id and entities.has_incident(inc_id):
+                            row = entities.incident(inc_id)
+                            changes = related_change_count(row, change_df, correlations)
+                            return f"Incident {inc_id}:\nDescription: {row['description']}\nCause: {row['cause']}\nResolution: {row['resolution']}\nRelated Changes: {changes}"
 
                     if any(k in recent_context.lower() for k in ["trace", "log"]) or extract_uuid(recent_context):
                         trace_id = extract_uuid(recent_context) or next((word for word in recent_context.split() if word.startswith("trace") or word.startswith("log")), None)
                         logs = get_logs_for_trace_id(trace_id, logs_df)
                         if logs:
-                            return "\n".join(summarize_logs(logs))
+                            return "\n".join(summarize_logs(logs, trace_id))
 
                     #Default to GenAI network response.
                     unknown_targets = check_unknown_targets(combined_prompt, all_apps)
                     if unknown_targets:
                         return f"⚠️ Unknown system(s) mentioned: {', '.join(unknown_targets)}. Please check the system name(s)."
 
-                    return generate_genai_response(combined_prompt, network_data)
+                    return genai_answer(combined_prompt, network_data, stream)
     
     
 
@@ -1,6 +1,109 @@
+import ast
+import hashlib
+import json
+import os
+
+import numpy as np
 import pandas as pd
 
-def load_incident_data(filepath):
+# Each CSV source is converted once into a Parquet file (dtypes, parsed dates and derived columns
+# included) and reloaded from there until the source's content changes. A touched file with the
+# same content only refreshes the recorded mtime.
+DATA_CACHE_DIR = "data/.cache/tables"
+DATA_CACHE_VERSION = 1
+
+# Low-cardinality columns kept as pandas categoricals
+CATEGORICAL_COLUMNS = {
+    "incidents": ["app", "app_name", "category", "urgency", "status"],
+    "changes": ["app"],
+    "cmdb": ["app", "data_source"],
+}
+# Date columns parsed once into a datetime64 companion column; the original string column stays
+PARSED_DATES = {"incident_date": "incident_day", "date": "change_day"}
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _read_meta(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _write_atomic(path, write):
+    tmp = f"{path}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+def _write_meta(path, meta):
+    def write(tmp):
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+    _write_atomic(path, write)
+
+def cached_source(source, convert, save, load, suffix):
+    # convert(source) -> data; save(data, path) / load(path) handle the cached file
+    os.makedirs(DATA_CACHE_DIR, exist_ok=True)
+    name = os.path.splitext(os.path.basename(source))[0]
+    target = os.path.join(DATA_CACHE_DIR, name + suffix)
+    meta_path = os.path.join(DATA_CACHE_DIR, name + ".meta.json")
+    stat = os.stat(source)
+    meta = _read_meta(meta_path)
+    valid = meta.get("version") == DATA_CACHE_VERSION and meta.get("source") == source and os.path.exists(target)
+
+    if valid and meta.get("mtime_ns") == stat.st_mtime_ns and meta.get("size") == stat.st_size:
+        return load(target)
+    digest = file_hash(source)
+    if valid and meta.get("sha1") == digest:
+        meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        _write_meta(meta_path, meta)
+        return load(target)
+
+    data = convert(source)
+    try:
+        _write_atomic(target, lambda tmp: save(data, tmp))
+    except Exception as e:
+        print(f"⚠️ Could not cache {source} ({e}); it will be parsed again next time")
+        return data
+    meta = {"version": DATA_CACHE_VERSION, "source": source, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha1": digest}
+    _write_meta(meta_path, meta)
+    print(f"📦 Cached {source} -> {target}")
+    return data
+
+def optimize_dtypes(df, kind):
+    for column, parsed in PARSED_DATES.items():
+        if column in df:
+            df[parsed] = pd.to_datetime(df[column], errors="coerce")
+    for column in CATEGORICAL_COLUMNS.get(kind, []):
+        if column in df:
+            values = df[column].astype("category")
+            # Keeps fillna("") working on the categorical
+            if values.isna().any() and "" not in values.cat.categories:
+                values = values.cat.add_categories("")
+            df[column] = values
+    return df
+
+def cached_table(source, kind, convert=pd.read_csv):
+    return cached_source(
+        source,
+        lambda path: optimize_dtypes(convert(path), kind),
+        lambda df, path: df.to_parquet(path, index=False),
+        pd.read_parquet,
+        ".parquet",
+    )
+
+def parsed_dates(df, column):
+    # datetime64[D] values of a date column, from the pre-parsed companion column when there is one
+    parsed = PARSED_DATES.get(column)
+    values = df[parsed] if parsed in df else pd.to_datetime(df[column], errors="coerce")
+    return values.values.astype("datetime64[D]")
+
+def _read_incidents(filepath):
     df = pd.read_csv(filepath)
     df.fillna("", inplace=True)
 
@@ -16,3 +119,23 @@ def load_incident_data(filepath):
     )
 
     return df
+
+def load_incident_data(filepath):
+    return cached_table(filepath, "incidents", _read_incidents)
+
+def _read_network(filepath):
+    network_df = pd.read_csv(filepath)
+    network_df["api_flows"] = network_df["api_flows"].apply(ast.literal_eval)
+    return network_df.to_dict(orient="records")
+
+def load_network_data(filepath):
+    # Topology records with api_flows already parsed, cached as JSON
+    def save(records, path):
+        with open(path, "w") as f:
+            json.dump(records, f, default=lambda v: v.item() if isinstance(v, np.generic) else str(v))
+
+    def load(path):
+        with open(path) as f:
+            return json.load(f)
+
+    return cached_source(filepath, _read_network, save, load, ".json")
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+
+from app.change_checker import build_change_index, load_changes, load_cmdb
+from app.change_correlation import CorrelationTable
+from app.data_loader import file_hash, load_incident_data, load_network_data
+from app.entity_store import build_entity_store
+from app.vector_search import build_vector_index
+
+DATA_SOURCES = {
+    "incidents": "data/incident_data.csv",
+    "changes": "data/change.csv",
+    "cmdb": "data/CMDB_Mapping.csv",
+    "network": "data/network_metadata.csv",
+}
+LOADERS = {
+    "incidents": load_incident_data,
+    "changes": load_changes,
+    "cmdb": load_cmdb,
+    "network": load_network_data,
+}
+
+# Every data source plus the structures derived from it, as of one version. Snapshots are not
+# modified after they are published; a reload builds the next one, so a request that grabbed a
+# snapshot keeps seeing the same incidents, index and topology until it is done.
+class DataSnapshot:
+
+    def __init__(self, version, data, vector_index, change_index, correlations, entities):
+        self.version = version
+        self.data = data  # source name -> loaded table / records
+        self.incidents = data["incidents"]
+        self.cmdb = data["cmdb"]
+        self.index, self.embeddings, self.model = vector_index
+        self.change_index = change_index
+        self.correlations = correlations
+        self.entities = entities
+        self.loaded_at = time.time()
+
+    @property
+    def network(self):
+        return self.entities.network
+
+# Watches the data/ sources and reloads only the ones whose content changed (mtime/size first,
+# then a content hash), rebuilding just the derived structures that depend on them:
+#   incidents -> vector index (incremental sync), correlations, entity store
+#   changes   -> change index, correlations
+#   cmdb / network -> entity store (topology)
+# The new snapshot is swapped in under the next version number. The persistent correlation table
+# is updated incrementally and each snapshot gets its own in-memory copy of it.
+class DataManager:
+
+    def __init__(self, sources=None, index_builder=build_vector_index, correlations=None):
+        self.sources = dict(DATA_SOURCES, **(sources or {}))
+        self.index_builder = index_builder
+        self.correlations = correlations or CorrelationTable()
+        self.signatures = {}  # source -> (mtime_ns, size, sha1) of the loaded version
+        self.lock = threading.Lock()
+        self.current = None
+        self.watch_thread = None
+        self.refresh()
+
+    def snapshot(self):
+        return self.current
+
+    def _changed_sources(self):
+        changed = {}
+        for name, path in self.sources.items():
+            stat = os.stat(path)
+            known = self.signatures.get(name)
+            if known and known[:2] == (stat.st_mtime_ns, stat.st_size):
+                continue
+            digest = file_hash(path)
+            if known and known[2] == digest:
+                # Touched or rewritten with the same content
+                self.signatures[name] = (stat.st_mtime_ns, stat.st_size, digest)
+                continue
+            changed[name] = (stat.st_mtime_ns, stat.st_size, digest)
+        return changed
+
+    def refresh(self):
+        # Returns the current snapshot, reloading first if any source changed
+        with self.lock:
+            changed = self._changed_sources()
+            if not changed:
+                return self.current
+            previous = self.current
+            data = {
+                name: LOADERS[name](path) if name in changed else previous.data[name]
+                for name, path in self.sources.items()
+            }
+
+            vector_index = self.index_builder(data["incidents"]) if "incidents" in changed \
+                else (previous.index, previous.embeddings, previous.model)
+            change_index = build_change_index(data["changes"]) if "changes" in changed else previous.change_index
+            if "incidents" in changed or "changes" in changed:
+                self.correlations.update(data["incidents"], change_index)
+                correlations = self.correlations.copy()
+            else:
+                correlations = previous.correlations
+            entities = build_entity_store(data["incidents"], data["cmdb"], data["network"]) \
+                if changed.keys() & {"incidents", "cmdb", "network"} else previous.entities
+
+            version = previous.version + 1 if previous else 1
+            self.current = DataSnapshot(version, data, vector_index, change_index, correlations, entities)
+            self.signatures.update(changed)
+        print(f"🔁 Data v{version}: loaded {', '.join(changed)}")
+        return self.current
+
+    def start_watching(self, interval_seconds=10.0):
+        # Background poll of the sources; a failed reload keeps serving the previous snapshot
+        if self.watch_thread is not None or interval_seconds <= 0:
+            return self.watch_thread
+
+        def watch():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"⚠️ Data reload failed: {e}")
+
+        self.watch_thread = threading.Thread(target=watch, name="data-watch", daemon=True)
+        self.watch_thread.start()
+        return self.watch_thread
@@ -0,0 +1,75 @@
+# Network metadata entries, still a plain list for code that iterates over it, plus hash
+# indexes for the lookups the UI and prompts make per request.
+class NetworkTopology(list):
+
+    def __init__(self, entries):
+        super().__init__(entries)
+        self.by_app = {entry["app"]: entry for entry in self}
+        self.inbound_by_app = {}
+        for entry in self:
+            for api in entry["api_flows"]:
+                self.inbound_by_app.setdefault(api["connects_to"], []).append((entry["app"], api))
+
+    def entry(self, app_name):
+        return self.by_app.get(app_name)
+
+    def inbound(self, app_name):
+        # (calling app, api flow) pairs for every flow that targets app_name
+        return [(app, api) for app, api in self.inbound_by_app.get(app_name, []) if app != app_name]
+
+def topology_entry(network_data, app_name):
+    if isinstance(network_data, NetworkTopology):
+        return network_data.entry(app_name)
+    return next((entry for entry in network_data if entry["app"] == app_name), None)
+
+def inbound_flows(network_data, app_name):
+    if isinstance(network_data, NetworkTopology):
+        return network_data.inbound(app_name)
+    return [
+        (other["app"], api) for other in network_data if other["app"] != app_name
+        for api in other["api_flows"] if api["connects_to"] == app_name
+    ]
+
+# Incidents, CMDB and network metadata indexed once at load time, so per-request lookups
+# (incident by id, CIs / data sources of an app, app of a CI, app topology) are dict hits.
+class EntityStore:
+
+    def __init__(self, incident_df, cmdb_df, network_data):
+        self.incidents = incident_df
+        self.incident_positions = {incident_id: i for i, incident_id in enumerate(incident_df["incident_id"])}
+        self.incident_apps = sorted(incident_df["app"].dropna().unique())
+        traces = incident_df["trace_id"].fillna("")
+        self.app_traces = {app: set(group) for app, group in traces[traces != ""].groupby(incident_df["app"])}
+
+        self.app_cis = {app: group["ci_id"].tolist() for app, group in cmdb_df.groupby("app", sort=False)}
+        self.app_data_sources = {app: group["data_source"].unique().tolist() for app, group in cmdb_df.groupby("app", sort=False)}
+        self.ci_apps = dict(zip(cmdb_df["ci_id"], cmdb_df["app"]))
+        self.cmdb_apps = sorted(cmdb_df["app"].unique())
+
+        self.network = network_data if isinstance(network_data, NetworkTopology) else NetworkTopology(network_data)
+
+    def incident(self, incident_id):
+        # The incident's row as a Series, or None
+        position = self.incident_positions.get(incident_id)
+        return self.incidents.iloc[position] if position is not None else None
+
+    def has_incident(self, incident_id):
+        return incident_id in self.incident_positions
+
+    def cis_for_app(self, app):
+        return self.app_cis.get(app, [])
+
+    def data_sources_for_app(self, app):
+        return self.app_data_sources.get(app, [])
+
+    def app_for_ci(self, ci_id):
+        return self.ci_apps.get(ci_id)
+
+    def traces_for_app(self, app):
+        return self.app_traces.get(app, set())
+
+    def topology(self, app):
+        return self.network.entry(app)
+
+def build_entity_store(incident_df, cmdb_df, network_data):
+    return EntityStore(incident_df, cmdb_df, network_data)
@@ -0,0 +1,76 @@
+import faiss
+import os
+
+# Backends: "flat" (exact), "ivf_flat", "hnsw", "ivf_pq". nprobe / ef_search are
+# query-time knobs and can be changed without rebuilding the index.
+DEFAULT_INDEX_CONFIG = {
+    "backend": os.getenv("IPE_INDEX_BACKEND", "flat"),
+    "nlist": int(os.getenv("IPE_INDEX_NLIST", "1024")),
+    "nprobe": int(os.getenv("IPE_INDEX_NPROBE", "16")),
+    "hnsw_m": int(os.getenv("IPE_INDEX_HNSW_M", "32")),
+    "ef_construction": int(os.getenv("IPE_INDEX_EF_CONSTRUCTION", "80")),
+    "ef_search": int(os.getenv("IPE_INDEX_EF_SEARCH", "64")),
+    "pq_m": int(os.getenv("IPE_INDEX_PQ_M", "48")),
+    "pq_nbits": int(os.getenv("IPE_INDEX_PQ_NBITS", "8")),
+}
+
+QUERY_TIME_KEYS = ("nprobe", "ef_search")
+
+def resolve_index_config(config=None):
+    resolved = dict(DEFAULT_INDEX_CONFIG)
+    resolved.update(config or {})
+    return resolved
+
+def build_config_key(config):
+    # Only settings that change the stored structure; query-time knobs are excluded
+    return {k: v for k, v in resolve_index_config(config).items() if k not in QUERY_TIME_KEYS}
+
+def make_faiss_index(dimension, config=None, n_train=0):
+    config = resolve_index_config(config)
+    backend = config["backend"]
+
+    if backend == "flat":
+        return faiss.IndexFlatL2(dimension)
+
+    if backend == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, config["hnsw_m"])
+        index.hnsw.efConstruction = config["ef_construction"]
+        return index
+
+    if backend not in ("ivf_flat", "ivf_pq"):
+        raise ValueError(f"Unknown index backend: {backend}")
+
+    # FAISS wants ~39 training points per centroid; shrink nlist for small corpora
+    nlist = max(1, min(config["nlist"], n_train // 39))
+    if backend == "ivf_pq":
+        if dimension % config["pq_m"] == 0 and n_train >= 39 * 2 ** config["pq_nbits"]:
+            return faiss.index_factory(dimension, f"IVF{nlist},PQ{config['pq_m']}x{config['pq_nbits']}")
+        print(f"⚠️ Not enough vectors ({n_train}) or incompatible pq_m for IVF-PQ, using IVF-Flat instead.")
+    return faiss.index_factory(dimension, f"IVF{nlist},Flat")
+
+def train_if_needed(index, vectors):
+    if not index.is_trained:
+        index.train(vectors)
+
+def make_search_params(index, config=None, sel=None):
+    config = resolve_index_config(config)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+
+    if isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = config["nprobe"]
+    elif isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = config["ef_search"]
+    elif sel is None:
+        return None
+    else:
+        params = faiss.SearchParameters()
+
+    if sel is not None:
+        params.sel = sel
+    return params
+
+def index_memory_bytes(index):
+    return int(faiss.serialize_index(index).nbytes)
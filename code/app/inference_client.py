@@ -0,0 +1,79 @@
+import json
+import os
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+# When set (e.g. http://127.0.0.1:8765), models and the incident index are served by
+# app/inference_server.py instead of being loaded into this process.
+INFERENCE_URL = os.getenv("IPE_INFERENCE_URL", "").rstrip("/")
+INFERENCE_TIMEOUT = float(os.getenv("IPE_INFERENCE_TIMEOUT", "300"))
+
+def remote_inference_enabled():
+    return bool(INFERENCE_URL)
+
+def _request(path, payload=None):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(
+        f"{INFERENCE_URL}{path}", data=data, headers={"Content-Type": "application/json"},
+        method="POST" if data is not None else "GET",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=INFERENCE_TIMEOUT) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        detail = e.read().decode("utf-8", errors="ignore")
+        raise RuntimeError(f"Inference server error on {path}: {detail}") from e
+
+def health():
+    return _request("/health")
+
+# Drop-in for a transformers pipeline: called with the same inputs/kwargs, returns the same list of dicts
+class RemotePipeline:
+
+    def __init__(self, name):
+        self.name = name
+
+    def __call__(self, inputs, **kwargs):
+        return _request(f"/pipeline/{self.name}", {"inputs": inputs, "kwargs": kwargs})["outputs"]
+
+# Drop-in for the SentenceTransformer methods the app uses
+class RemoteEmbedder:
+
+    def __init__(self, name):
+        self.name = name
+        self._dimension = None
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        single = isinstance(texts, str)
+        response = _request(f"/embed/{self.name}", {"texts": [texts] if single else list(texts)})
+        embeddings = np.asarray(response["embeddings"], dtype="float32")
+        return embeddings[0] if single else embeddings
+
+    def get_sentence_embedding_dimension(self):
+        if self._dimension is None:
+            self._dimension = int(self.encode(["dimension probe"]).shape[1])
+        return self._dimension
+
+# Same search() contract as IncidentIndex, answered by the server's warm index
+class RemoteIncidentIndex:
+
+    def search(self, query_embeddings, top_k, filters=None):
+        response = _request("/search", {
+            "embeddings": np.asarray(query_embeddings, dtype="float32").tolist(),
+            "top_k": top_k,
+            "filters": filters,
+        })
+        return response["keys"], response["distances"]
+
+    def reload(self):
+        # Ask the server to pick up changes to its incident CSV
+        return _request("/reload", {})
+
+    @property
+    def ntotal(self):
+        return health()["index_size"]
+
+def remote_model(name, task):
+    return RemoteEmbedder(name) if task == "sentence-embedding" else RemotePipeline(name)
@@ -0,0 +1,128 @@
+# Long-lived inference service: one warm copy of the models and the incident index shared
+# by every Streamlit worker that points IPE_INFERENCE_URL at it.
+#
+#   python -m app.inference_server --port 8765
+#   IPE_INFERENCE_URL=http://127.0.0.1:8765 streamlit run streamlit_app.py
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app import model_registry
+from app.batcher import batched_model, batcher_stats
+from app.data_loader import file_hash, load_incident_data
+from app.vector_search import build_vector_index
+
+state = {"index": None, "data_path": None, "data_hash": None, "started_at": time.time()}
+reload_lock = threading.Lock()
+
+# Requests from different UI workers are coalesced by the micro-batchers
+def handle_embed(name, payload):
+    model = batched_model(name)
+    embeddings = model.encode(payload["texts"], convert_to_numpy=True)
+    return {"embeddings": embeddings.tolist()}
+
+def handle_pipeline(name, payload):
+    pipeline = batched_model(name)
+    # The client's batch size means nothing here; the server-side batcher sets its own
+    kwargs = {k: v for k, v in payload.get("kwargs", {}).items() if k != "batch_size"}
+    return {"outputs": pipeline(payload["inputs"], **kwargs)}
+
+def handle_search(payload):
+    if state["index"] is None:
+        raise RuntimeError("Incident index not loaded on this server")
+    keys, distances = state["index"].search(payload["embeddings"], payload["top_k"], payload.get("filters"))
+    return {"keys": keys, "distances": distances}
+
+def load_index(data_path):
+    # (Re)index the incident CSV; skipped if its content hasn't changed. Searches already
+    # running keep the index object they started with.
+    with reload_lock:
+        digest = file_hash(data_path)
+        if state["index"] is None or digest != state["data_hash"]:
+            index, _, _ = build_vector_index(load_incident_data(data_path))
+            state.update({"index": index, "data_path": data_path, "data_hash": digest})
+    return state["index"]
+
+def handle_reload():
+    if state["data_path"] is None:
+        raise RuntimeError("Incident index not loaded on this server")
+    return {"index_size": load_index(state["data_path"]).ntotal}
+
+def handle_health():
+    index = state["index"]
+    return {
+        "status": "ok",
+        "uptime_seconds": round(time.time() - state["started_at"], 1),
+        "index_size": index.ntotal if index is not None else 0,
+        "models": model_registry.model_stats(),
+        "pool": model_registry.pool_stats(),
+        "batching": batcher_stats(),
+    }
+
+class InferenceHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._respond(200, handle_health())
+        else:
+            self._respond(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            parts = self.path.strip("/").split("/", 1)
+            if parts[0] == "embed" and len(parts) == 2:
+                result = handle_embed(parts[1], payload)
+            elif parts[0] == "pipeline" and len(parts) == 2:
+                result = handle_pipeline(parts[1], payload)
+            elif parts[0] == "search":
+                result = handle_search(payload)
+            elif parts[0] == "reload":
+                result = handle_reload()
+            else:
+                self._respond(404, {"error": f"Unknown path {self.path}"})
+                return
+            self._respond(200, result)
+        except KeyError as e:
+            self._respond(400, {"error": f"Bad request: {e}"})
+        except Exception as e:
+            self._respond(500, {"error": str(e)})
+
+    def _respond(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(host="127.0.0.1", port=8765, data_path="data/incident_data.csv", warm_up=None):
+    # This process owns the models, so never forward to another server
+    model_registry.REMOTE_URL = ""
+    if data_path:
+        load_index(data_path)
+    if warm_up:
+        model_registry.warm_up(warm_up)
+
+    server = ThreadingHTTPServer((host, port), InferenceHandler)
+    server.daemon_threads = True
+    print(f"🚀 Inference server listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve embeddings, search, summarization and generation")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data", default="data/incident_data.csv", help="incident CSV to index ('' to skip)")
+    parser.add_argument("--warm-up", default="embedder", help="comma-separated models to preload")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.data, [n for n in args.warm_up.split(",") if n])
@@ -54,7 +54,8 @@
 #     return "Content not found."
 
 
-from transformers import pipeline
+from app.batcher import batched_model
+from app.prompt_builder import build_prompt, rank_chunks, section
 import pandas as pd
 import os
 import uuid
@@ -62,11 +63,10 @@ import datetime
 
 KB_FILE = "data/knowledgebase.csv"
 
-# Initialize the BART summarizer pipeline
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn", device=-1)
-
 def summarize_text_bart(content):
     try:
+        # BART summarizer pipeline, loaded on first use and batched with concurrent callers
+        summarizer = batched_model("doc_summarizer")
         summary_chunks = []
         max_input = 1024
         step = 800
@@ -115,6 +115,11 @@ def query_entry(doc_id, question):
     content = get_content_by_id(doc_id)
     if content:
         from app.model_runner import generate_genai_response
-        prompt = f"Answer the following question based on this content:\n{content}\n\nQuestion: {question}"
+        # Only the parts of the document most relevant to the question, within the token budget
+        prompt = build_prompt([
+            section("fixed", "Answer the following question based on this content:"),
+            section("context", items=rank_chunks(content, question), separator="\n\n"),
+            section("question", f"Question: {question}"),
+        ])
         return generate_genai_response(prompt, [])
     return "Content not found."
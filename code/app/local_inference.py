@@ -0,0 +1,129 @@
+import os
+import re
+
+# How local models run on CPU:
+#   torch      stock fp32 PyTorch (default)
+#   int8       PyTorch with int8 dynamic quantization of the Linear layers, applied at load
+#   onnx       exported once to ONNX Runtime, cached under MODEL_CACHE_DIR
+#   onnx-int8  ONNX export plus int8 dynamic quantization, cached under MODEL_CACHE_DIR
+LOCAL_INFERENCE = os.getenv("IPE_LOCAL_INFERENCE", "torch")
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+MODEL_CACHE_DIR = "data/.cache/models"
+# Instruction set targeted by ONNX Runtime quantization: avx2 runs everywhere we deploy, avx512_vnni is faster where present
+ONNX_QUANTIZATION_ISA = os.getenv("IPE_ONNX_QUANTIZATION_ISA", "avx2")
+
+def artifact_dir(model_id, backend):
+    return os.path.join(MODEL_CACHE_DIR, backend, re.sub(r"[^A-Za-z0-9_.-]", "__", model_id))
+
+def load_local_model(spec, backend=None, fallback=True):
+    # The backend that actually loaded is recorded on the model as local_backend
+    backend = backend or spec.get("backend") or LOCAL_INFERENCE
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown local inference backend: {backend}")
+    if backend != "torch":
+        try:
+            if spec["task"] == "sentence-embedding":
+                model = _load_embedder(spec["model"], backend)
+            else:
+                model = _load_pipeline(spec["task"], spec["model"], backend)
+            model.local_backend = backend
+            return model
+        except Exception as e:
+            if not fallback:
+                raise
+            # Missing optimum/onnxruntime or a failed export must not take the feature down
+            print(f"⚠️ {backend} backend unavailable for {spec['model']} ({e}), using fp32 PyTorch")
+    model = _load_torch(spec)
+    model.local_backend = "torch"
+    return model
+
+def _load_torch(spec):
+    if spec["task"] == "sentence-embedding":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(spec["model"])
+    from transformers import pipeline
+    return pipeline(spec["task"], model=spec["model"], device=-1)
+
+def quantize_int8(module):
+    import torch
+    return torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+def _load_embedder(model_id, backend):
+    from sentence_transformers import SentenceTransformer
+    if backend == "int8":
+        return quantize_int8(SentenceTransformer(model_id))
+
+    target = artifact_dir(model_id, "onnx")
+    if not os.path.exists(os.path.join(target, "onnx", "model.onnx")):
+        print(f"🔄 Exporting {model_id} to ONNX...")
+        SentenceTransformer(model_id, backend="onnx").save(target)
+    if backend == "onnx":
+        return SentenceTransformer(target, backend="onnx")
+
+    quantized = f"onnx/model_qint8_{ONNX_QUANTIZATION_ISA}.onnx"
+    if not os.path.exists(os.path.join(target, quantized)):
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+        print(f"🔄 Quantizing {model_id} ONNX model to int8...")
+        export_dynamic_quantized_onnx_model(SentenceTransformer(target, backend="onnx"), ONNX_QUANTIZATION_ISA, target)
+    return SentenceTransformer(target, backend="onnx", model_kwargs={"file_name": quantized})
+
+# File layouts of an optimum seq2seq ONNX export, tried in order: recent versions write one merged decoder
+# that serves the first and later steps; older ones a decoder plus a decoder-with-past; an export without
+# the KV cache only a plain decoder. Each comes with the loader options it needs.
+SEQ2SEQ_ONNX_LAYOUTS = [
+    ({"encoder_file_name": "encoder_model.onnx", "decoder_file_name": "decoder_model_merged.onnx"},
+     {"use_merged": True}),
+    ({"encoder_file_name": "encoder_model.onnx", "decoder_file_name": "decoder_model.onnx",
+      "decoder_with_past_file_name": "decoder_with_past_model.onnx"},
+     {"use_merged": False}),
+    ({"encoder_file_name": "encoder_model.onnx", "decoder_file_name": "decoder_model.onnx"},
+     {"use_merged": False, "use_cache": False}),
+]
+
+def _seq2seq_onnx_layout(export_dir):
+    present = set(os.listdir(export_dir))
+    for file_names, options in SEQ2SEQ_ONNX_LAYOUTS:
+        if set(file_names.values()) <= present:
+            return dict(file_names), dict(options)
+    found = sorted(f for f in present if f.endswith(".onnx"))
+    raise FileNotFoundError(f"no known seq2seq ONNX layout in {export_dir} (found {found})")
+
+def _ort_model_class(task):
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    if task in ("summarization", "text2text-generation"):
+        return ORTModelForSeq2SeqLM
+    raise ImportError(f"no ONNX Runtime model class wired up for task '{task}'")
+
+def _load_pipeline(task, model_id, backend):
+    from transformers import AutoTokenizer, pipeline
+    if backend == "int8":
+        pipe = pipeline(task, model=model_id, device=-1)
+        pipe.model = quantize_int8(pipe.model)
+        return pipe
+
+    model_class = _ort_model_class(task)
+    export_dir = artifact_dir(model_id, "onnx")
+    if not os.path.exists(os.path.join(export_dir, "config.json")):
+        print(f"🔄 Exporting {model_id} to ONNX (one-off, cached in {export_dir})...")
+        model_class.from_pretrained(model_id, export=True).save_pretrained(export_dir)
+
+    model_dir = export_dir
+    file_names, options = _seq2seq_onnx_layout(export_dir)
+    if backend == "onnx-int8":
+        model_dir = artifact_dir(model_id, "onnx-int8")
+        # ORTQuantizer writes <name>_quantized.onnx next to a copy of the config
+        quantized = {name: f"{name[:-len('.onnx')]}_quantized.onnx" for name in file_names.values()}
+        missing = [name for name, target in quantized.items() if not os.path.exists(os.path.join(model_dir, target))]
+        if missing:
+            from optimum.onnxruntime import ORTQuantizer
+            from optimum.onnxruntime.configuration import AutoQuantizationConfig
+            print(f"🔄 Quantizing {model_id} ONNX model to int8 ({', '.join(missing)})...")
+            config = getattr(AutoQuantizationConfig, ONNX_QUANTIZATION_ISA)(is_static=False, per_channel=False)
+            for file_name in missing:
+                ORTQuantizer.from_pretrained(export_dir, file_name=file_name).quantize(save_dir=model_dir, quantization_config=config)
+        file_names = {arg: quantized[name] for arg, name in file_names.items()}
+
+    print(f"📦 Loading {model_id} ({backend}) from {model_dir}: {', '.join(file_names.values())}")
+    model = model_class.from_pretrained(model_dir, **file_names, **options)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    return pipeline(task, model=model, tokenizer=tokenizer, device=-1)
@@ -1,27 +1,537 @@
-import pandas as pd
+import glob
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
 
-# Optional: Only import transformers when needed
 try:
-    from transformers import pipeline
-    summarizer = pipeline("summarization", model="sshleifer/distilbart-cnn-12-6")
-except ImportError:
-    summarizer = None
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, so run one writer per cache directory
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+from app.batcher import batched_model
+from app.log_templates import condense_logs
+from app.model_registry import MODEL_SPECS, get_model
+from app.prompt_builder import count_tokens, truncate_tokens
+from app.response_cache import ResponseCache
+
+# Optional: transformers is only imported when the summarizer is first needed
+def get_summarizer():
+    try:
+        get_model("log_summarizer")
+    except ImportError:
+        return None
+    # Concurrent summaries from different sessions share one batched forward pass
+    return batched_model("log_summarizer")
+
+LOG_STORE_DIR = "data/.cache/logs"
+LOG_SUMMARY_CACHE_PATH = "data/.cache/log_summaries.sqlite"
+# Ingestion reads the CSV this many bytes at a time; each chunk becomes one segment
+CHUNK_BYTES = int(float(os.getenv("IPE_LOG_CHUNK_MB", "64")) * 1024 * 1024)
+# Small segments left by tailing are merged once there are more than MAX_SMALL_SEGMENTS of them
+SMALL_SEGMENT_LINES = 100_000
+MAX_SMALL_SEGMENTS = 8
+
+# One ingested chunk of the log file. Lines are stored sorted by trace_id (file order kept within a trace):
+#   lines.bin         utf-8 log lines back to back
+#   line_offsets.npy  byte offset of each line in lines.bin, plus the end offset
+#   traces.npy        distinct trace_ids in storage order
+#   trace_starts.npy  index of each trace's first line, plus the line count
+# Everything is memory-mapped except the trace_id list, which the store indexes (LogStore.trace_locations).
+class LogSegment:
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.lines = np.memmap(os.path.join(path, "lines.bin"), dtype=np.uint8, mode="r") \
+            if os.path.getsize(os.path.join(path, "lines.bin")) else np.zeros(0, dtype=np.uint8)
+        self.line_offsets = np.load(os.path.join(path, "line_offsets.npy"), mmap_mode="r")
+        self.trace_starts = np.load(os.path.join(path, "trace_starts.npy"), mmap_mode="r")
+        self.traces = np.load(os.path.join(path, "traces.npy"))
+        if not os.path.exists(os.path.join(path, "terms.npy")):
+            write_term_index(path, self._lines(0, len(self)))  # segment from before full-text search
+        self.terms = np.load(os.path.join(path, "terms.npy"), mmap_mode="r")
+        self.term_starts = np.load(os.path.join(path, "term_starts.npy"), mmap_mode="r")
+        self.postings = np.load(os.path.join(path, "postings.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.line_offsets) - 1
+
+    def _lines(self, first, last):
+        offsets = np.asarray(self.line_offsets[first:last + 1]) - self.line_offsets[first]
+        blob = bytes(self.lines[self.line_offsets[first]:self.line_offsets[last]])
+        return [blob[a:b].decode("utf-8") for a, b in zip(offsets[:-1], offsets[1:])]
+
+    def trace_lines(self, i):
+        # Lines of the i-th trace in storage order
+        return self._lines(int(self.trace_starts[i]), int(self.trace_starts[i + 1]))
+
+    def term_postings(self, term):
+        i = int(np.searchsorted(self.terms, term))
+        if i < len(self.terms) and self.terms[i] == term:
+            return np.asarray(self.postings[self.term_starts[i]:self.term_starts[i + 1]])
+        return np.empty(0, dtype=np.int64)
+
+    def search(self, terms, phrases):
+        # Yields (trace_id, line) for lines containing every term and phrase
+        if not terms:
+            return
+        matches = None
+        for term in sorted(terms, key=lambda t: len(self.term_postings(t))):
+            postings = self.term_postings(term)
+            matches = postings if matches is None else np.intersect1d(matches, postings, assume_unique=True)
+            if not len(matches):
+                return
+        traces = np.searchsorted(self.trace_starts, matches, side="right") - 1
+        for n, t in zip(matches.tolist(), traces.tolist()):
+            line = self._lines(n, n + 1)[0]
+            normalized = f" {' '.join(tokenize(line))} "
+            if all(f" {phrase} " in normalized for phrase in phrases):
+                yield str(self.traces[t]), line
+
+    def records(self):
+        # (trace_ids, lines) in storage order, for merging segments
+        return np.repeat(self.traces, np.diff(self.trace_starts)).tolist(), self._lines(0, len(self))
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def write_term_index(path, lines):
+    # Inverted index of a segment, lines given in storage order:
+    #   terms.npy        distinct lowercase terms, sorted (binary-searched, memory-mapped)
+    #   term_starts.npy  where each term's postings begin in postings.npy, plus the end
+    #   postings.npy     ascending line numbers containing the term
+    term_ids = {}
+    pair_terms, pair_lines = [], []
+    for n, line in enumerate(lines):
+        for term in set(tokenize(line)):
+            pair_terms.append(term_ids.setdefault(term, len(term_ids)))
+            pair_lines.append(n)
+    terms = np.array(sorted(term_ids), dtype=str)
+    rank = np.empty(len(term_ids), dtype=np.int64)
+    rank[[term_ids[t] for t in terms.tolist()]] = np.arange(len(terms))
+    term_col = rank[np.asarray(pair_terms, dtype=np.int64)]
+    line_col = np.asarray(pair_lines, dtype=np.int64)
+    order = np.lexsort((line_col, term_col))
+
+    np.save(os.path.join(path, "postings.npy"), line_col[order])
+    np.save(os.path.join(path, "term_starts.npy"), np.searchsorted(term_col[order], np.arange(len(terms) + 1)).astype(np.int64))
+    np.save(os.path.join(path, "terms.npy"), terms)  # written last: its presence marks a complete index
+
+def parse_query(query):
+    # "quoted phrases" must appear verbatim (modulo case/punctuation); every word must appear
+    phrases = [" ".join(tokenize(p)) for p in re.findall(r'"([^"]+)"', query)]
+    terms = tokenize(re.sub(r'"[^"]*"', " ", query)) + [t for p in phrases for t in p.split()]
+    return list(dict.fromkeys(terms)), [p for p in phrases if " " in p]
+
+def write_segment(path, trace_ids, lines):
+    # trace_ids / lines: parallel sequences in file order
+    tmp = path + ".tmp"
+    os.makedirs(tmp, exist_ok=True)
+    traces, codes = np.unique(np.asarray(trace_ids, dtype=object).astype(str), return_inverse=True)
+    order = np.argsort(codes, kind="stable")
+    encoded = [lines[i].encode("utf-8") for i in order]
+    line_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=line_offsets[1:])
+    trace_starts = np.searchsorted(codes[order], np.arange(len(traces) + 1)).astype(np.int64)
+
+    with open(os.path.join(tmp, "lines.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(tmp, "line_offsets.npy"), line_offsets)
+    np.save(os.path.join(tmp, "traces.npy"), traces)
+    np.save(os.path.join(tmp, "trace_starts.npy"), trace_starts)
+    write_term_index(tmp, [lines[i] for i in order])
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp, path)
+
+def _complete_rows(data):
+    # Length of the prefix of data made of whole CSV rows: it ends on a newline outside quotes.
+    # A last row without its newline may still be being written, so it is left for the next pass.
+    cut = data.rfind(b"\n") + 1
+    while cut and data.count(b'"', 0, cut) % 2:
+        cut = data.rfind(b"\n", 0, cut - 1) + 1
+    return cut
+
+def _head_hash(path, length):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read(min(length, 4096))).hexdigest()
+
+def _find_rotated(path, inode):
+    # logrotate-style rename: the file we were reading now lives at e.g. Logs_Lookup.csv.1
+    for candidate in glob.glob(glob.escape(path) + "?*"):
+        try:
+            if os.stat(candidate).st_ino == inode:
+                return candidate
+        except OSError:
+            continue
+    return None
+
+@contextmanager
+def _store_lock(cache_dir):
+    # Exclusive lock shared by every process using cache_dir (the UI's tailer, scripts/precompute_log_summaries.py).
+    # It lives next to the directory because a reset removes the directory itself.
+    os.makedirs(os.path.dirname(os.path.abspath(cache_dir)), exist_ok=True)
+    with open(os.path.abspath(cache_dir) + ".lock", "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+# Trace log store fed from Logs_Lookup.csv in bounded chunks. refresh() ingests whatever was appended
+# since the last pass, follows logrotate renames, and starts over if the file was replaced by other
+# content. get(trace_id) is one dict lookup plus one contiguous read per segment holding that trace
+# (usually one, however many segments there are). Several processes can share one cache directory:
+# ingestion, merges and state writes happen under a file lock, and each refresh first picks up
+# whatever the other processes recorded in meta.json.
+class LogStore:
+
+    def __init__(self, logs_path, cache_dir=LOG_STORE_DIR):
+        self.logs_path = logs_path
+        self.cache_dir = cache_dir
+        self.segments = []
+        # trace_id -> [(segment, trace position in it)] in file order. Lists are replaced, never mutated,
+        # so get() needs no lock while the tailer ingests.
+        self.trace_locations = {}
+        self.state = None
+        self.lock = threading.Lock()
+        self.metrics = {
+            "lines_ingested": 0, "last_batch_lines": 0, "lines_per_second": 0.0,
+            "lag_bytes": 0, "caught_up_at": time.time(), "rotations": 0, "resets": 0,
+        }
+        self.tail_thread = None
+        self._open()
+
+    def _open(self):
+        with self.lock, _store_lock(self.cache_dir):
+            self._load_state()
+            # Drop segment directories a crash left behind before they were recorded
+            for name in os.listdir(self.cache_dir):
+                if name.startswith("seg-") and name not in self.state["segments"]:
+                    shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+        self.refresh()
+        print(f"✅ Log store ready: {len(self):,} lines, {self.trace_count():,} traces")
+
+    def _load_state(self):
+        # Caller holds the store lock. Another process may have ingested, merged or reset since we last looked.
+        meta_path = os.path.join(self.cache_dir, "meta.json")
+        state = None
+        try:
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    state = json.load(f)
+            if state is not None and state == self.state:
+                return
+            if not state or state.get("source") != os.path.abspath(self.logs_path):
+                raise LookupError
+            known = {segment.name: segment for segment in self.segments}
+            segments = [known.get(name) or LogSegment(os.path.join(self.cache_dir, name)) for name in state["segments"]]
+        except (OSError, ValueError, LookupError) as e:
+            if state:
+                print(f"⚠️ Rebuilding unreadable log store ({e or 'different source file'})")
+            else:
+                print(f"🔄 Building the trace log store from {self.logs_path}...")
+            self._reset()
+            self._save_state()
+            return
+        self._relocate([s for s in self.segments if s not in segments], [s for s in segments if s not in self.segments])
+        self.state, self.segments = state, segments
+
+    def _reset(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir)
+        self.state = {
+            "source": os.path.abspath(self.logs_path), "inode": None, "offset": 0, "header": None,
+            "head_hash": None, "segments": [],
+            # Segment names are never reused, so other processes can't mistake a new segment for one they have open
+            "next_segment": self.state["next_segment"] if self.state else 0,
+        }
+        self.segments = []
+        self.trace_locations = {}
+
+    def _relocate(self, removed, added):
+        # Update trace_locations for segments leaving and joining the end of the store
+        gone = {id(segment) for segment in removed}
+        changed = {}
+        for segment in removed:
+            for trace_id in segment.traces.tolist():
+                changed[trace_id] = [loc for loc in self.trace_locations.get(trace_id, ()) if id(loc[0]) not in gone]
+        for segment in added:
+            for i, trace_id in enumerate(segment.traces.tolist()):
+                if trace_id not in changed:
+                    changed[trace_id] = list(self.trace_locations.get(trace_id, ()))
+                changed[trace_id].append((segment, i))
+        for trace_id, locations in changed.items():
+            if locations:
+                self.trace_locations[trace_id] = locations
+            else:
+                self.trace_locations.pop(trace_id, None)
+
+    def _save_state(self):
+        tmp = os.path.join(self.cache_dir, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, os.path.join(self.cache_dir, "meta.json"))
+
+    def refresh(self):
+        # Returns the number of new lines ingested
+        with self.lock, _store_lock(self.cache_dir):
+            start = time.perf_counter()
+            self._load_state()
+            if not os.path.exists(self.logs_path):
+                return 0
+            stat = os.stat(self.logs_path)
+            offset, inode = self.state["offset"], self.state["inode"]
+            ingested = 0
+            rotated = _find_rotated(self.logs_path, inode) if inode is not None and stat.st_ino != inode else None
+            if rotated:
+                print(f"🔁 {self.logs_path} was rotated; finishing {rotated} first")
+                ingested += self._ingest(rotated, at_eof_final=True)
+                self.metrics["rotations"] += 1
+                self._start_new_file()
+            elif stat.st_size < offset and stat.st_ino == inode:
+                print(f"✂️ {self.logs_path} was truncated; reading it from the start")
+                self._start_new_file()
+            elif offset and (stat.st_size < offset or _head_hash(self.logs_path, offset) != self.state["head_hash"]):
+                print(f"🔄 {self.logs_path} was replaced; rebuilding the log store")
+                self.metrics["resets"] += 1
+                self._reset()
+            ingested += self._ingest(self.logs_path)
+            self.state["inode"] = stat.st_ino
+            self._save_state()
+            self._merge_small_segments()
+
+            elapsed = time.perf_counter() - start
+            lag = max(os.path.getsize(self.logs_path) - self.state["offset"], 0)
+            self.metrics["lines_ingested"] += ingested
+            self.metrics["last_batch_lines"] = ingested
+            if ingested:
+                self.metrics["lines_per_second"] = round(ingested / elapsed, 1) if elapsed else 0.0
+            self.metrics["lag_bytes"] = lag
+            if lag == 0:
+                self.metrics["caught_up_at"] = time.time()
+            return ingested
+
+    def _start_new_file(self):
+        self.state.update({"offset": 0, "header": None, "head_hash": None})
+
+    def _ingest(self, path, at_eof_final=False):
+        ingested = 0
+        with open(path, "rb") as f:
+            if self.state["header"] is None:
+                header = f.readline()
+                if not header.endswith(b"\n"):
+                    return 0  # not even a full header yet
+                self.state["header"] = header.decode("utf-8")
+                self.state["offset"] = len(header)
+                self.state["head_hash"] = _head_hash(path, self.state["offset"])
+            f.seek(self.state["offset"])
+            while True:
+                data = f.read(CHUNK_BYTES)
+                if not data:
+                    break
+                cut = len(data) if at_eof_final and len(data) < CHUNK_BYTES else _complete_rows(data)
+                if not cut:
+                    if len(data) == CHUNK_BYTES:
+                        # One row longer than a chunk: read on until it ends
+                        data += f.readline()
+                        cut = len(data)
+                    else:
+                        break
+                ingested += self._add_chunk(data[:cut])
+                self.state["offset"] += cut
+                if self.state["offset"] - cut < 4096:
+                    # Fingerprint of the file's first 4 KB, to tell a rewritten copy from a replaced file
+                    self.state["head_hash"] = _head_hash(path, self.state["offset"])
+                f.seek(self.state["offset"])
+        return ingested
+
+    def _add_chunk(self, data):
+        chunk = pd.read_csv(io.BytesIO(self.state["header"].encode("utf-8") + data),
+                            usecols=["trace_id", "log"], dtype=str).dropna(subset=["trace_id"])
+        if chunk.empty:
+            return 0
+        name = f"seg-{self.state['next_segment']:06d}"
+        self.state["next_segment"] += 1
+        write_segment(os.path.join(self.cache_dir, name), chunk["trace_id"].tolist(), chunk["log"].fillna("").tolist())
+        segment = LogSegment(os.path.join(self.cache_dir, name))
+        self.segments = self.segments + [segment]
+        self._relocate([], [segment])
+        self.state["segments"] = [segment.name for segment in self.segments]
+        self._save_state()
+        return len(chunk)
+
+    def _merge_small_segments(self):
+        small = [s for s in self.segments if len(s) < SMALL_SEGMENT_LINES]
+        if len(small) <= MAX_SMALL_SEGMENTS:
+            return
+        # Merge the trailing run of small segments; file order is kept because segments are in file order
+        run = []
+        for segment in reversed(self.segments):
+            if len(segment) >= SMALL_SEGMENT_LINES:
+                break
+            run.insert(0, segment)
+        if len(run) < 2:
+            return
+        trace_ids, lines = [], []
+        for segment in run:
+            t, l = segment.records()
+            trace_ids.extend(t)
+            lines.extend(l)
+        name = f"seg-{self.state['next_segment']:06d}"
+        self.state["next_segment"] += 1
+        write_segment(os.path.join(self.cache_dir, name), trace_ids, lines)
+        merged = LogSegment(os.path.join(self.cache_dir, name))
+        self.segments = self.segments[:-len(run)] + [merged]
+        self._relocate(run, [merged])
+        self.state["segments"] = [segment.name for segment in self.segments]
+        self._save_state()
+        for segment in run:
+            shutil.rmtree(segment.path, ignore_errors=True)
+
+    def start_tailing(self, interval_seconds=5.0):
+        # Background refresh so TraceIQ sees lines for traces that are still in progress
+        if self.tail_thread is not None or interval_seconds <= 0:
+            return self.tail_thread
+
+        def tail():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"⚠️ Log tailing failed: {e}")
+
+        self.tail_thread = threading.Thread(target=tail, name="log-tail", daemon=True)
+        self.tail_thread.start()
+        return self.tail_thread
+
+    def stats(self):
+        metrics = dict(self.metrics)
+        caught_up_at = metrics.pop("caught_up_at")
+        metrics.update({
+            "lines": len(self),
+            "segments": len(self.segments),
+            "lag_seconds": 0.0 if metrics["lag_bytes"] == 0 else round(time.time() - caught_up_at, 1),
+        })
+        return metrics
+
+    def __len__(self):
+        return sum(len(segment) for segment in self.segments)
+
+    def trace_count(self):
+        return len(self.trace_locations)
+
+    def get(self, trace_id):
+        return [line for segment, i in self.trace_locations.get(trace_id, ()) for line in segment.trace_lines(i)]
+
+    def search(self, query, limit=20, trace_ids=None):
+        # {trace_id: matching lines} for up to limit traces, most recently ingested segments first
+        terms, phrases = parse_query(query)
+        matches = {}
+        for segment in reversed(self.segments):
+            for trace_id, line in segment.search(terms, phrases):
+                if trace_ids is not None and trace_id not in trace_ids:
+                    continue
+                if trace_id not in matches and len(matches) >= limit:
+                    return matches
+                matches.setdefault(trace_id, []).append(line)
+        return matches
 
 def load_logs(logs_path):
-    return pd.read_csv(logs_path)
+    return LogStore(logs_path)
 
-def get_logs_for_trace_id(trace_id, logs_df):
+def get_logs_for_trace_id(trace_id, logs):
     if not trace_id:
         return []
-    logs = logs_df[logs_df["trace_id"] == trace_id]
-    return logs["log"].tolist()
+    if isinstance(logs, pd.DataFrame):
+        return logs[logs["trace_id"] == trace_id]["log"].tolist()
+    return logs.get(trace_id)
+
+# distilbart reads at most 1024 tokens; the rest of a long trace used to be cut off silently
+SUMMARY_INPUT_TOKENS = 900
+
+def _pack(texts, budget):
+    # Greedily join lines into chunks of at most budget tokens
+    chunks, current, used = [], [], 0
+    for text in texts:
+        cost = count_tokens(text, "log_summarizer") + 1
+        if cost > budget:
+            text, cost = truncate_tokens(text, budget - 1, "log_summarizer"), budget
+        if current and used + cost > budget:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+        current.append(text)
+        used += cost
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+def _map_reduce_summary(summarizer, lines):
+    # Map: summarize each chunk (one batched call per round); reduce: summarize the partial summaries
+    # until they fit in a single input, so every part of the trace is covered
+    chunks = _pack(lines, SUMMARY_INPUT_TOKENS)
+    while len(chunks) > 1:
+        partials = summarizer(chunks, max_length=100, min_length=10, do_sample=False)
+        chunks = _pack([p["summary_text"] for p in partials], SUMMARY_INPUT_TOKENS)
+    return summarizer(chunks[0], max_length=100, min_length=30, do_sample=False)[0]["summary_text"]
+
+# Summaries are keyed by trace_id plus a hash of the trace's lines and the summarizer model, so a
+# trace that gains lines (or a model swap) gets a fresh summary while everything else is served from disk
+summary_cache = ResponseCache(
+    path=LOG_SUMMARY_CACHE_PATH,
+    max_entries=int(os.getenv("IPE_LOG_SUMMARY_CACHE_ENTRIES", "100000")),
+    ttl_seconds=0,
+)
+
+def summary_key(log_lines, trace_id=None):
+    digest = hashlib.sha1("\n".join(log_lines).encode("utf-8"))
+    digest.update(MODEL_SPECS["log_summarizer"]["model"].encode("utf-8"))
+    return f"{trace_id or ''}:{digest.hexdigest()}"
+
+def cached_log_summary(log_lines, trace_id=None):
+    cached = summary_cache.get("log_summary", summary_key(log_lines, trace_id)) if log_lines else None
+    return json.loads(cached) if cached is not None else None
+
+def search_logs(query, logs, limit=20, trace_ids=None):
+    if not query or not query.strip():
+        return {}
+    if isinstance(logs, pd.DataFrame):
+        terms, phrases = parse_query(query)
+        normalized = logs["log"].fillna("").map(lambda line: f" {' '.join(tokenize(line))} ")
+        mask = normalized.map(lambda line: all(f" {t} " in line for t in terms + phrases))
+        hits = logs[mask & (logs["trace_id"].isin(trace_ids) if trace_ids is not None else True)]
+        matches = {}
+        for trace_id, line in zip(hits["trace_id"], hits["log"]):
+            if trace_id not in matches and len(matches) >= limit:
+                break
+            matches.setdefault(trace_id, []).append(line)
+        return matches
+    return logs.search(query, limit, trace_ids)
+
+def summarize_logs(log_lines, trace_id=None):
+    cached = cached_log_summary(log_lines, trace_id)
+    if cached is not None:
+        return cached
 
-def summarize_logs(log_lines):
+    summarizer = get_summarizer() if log_lines else None
     if not summarizer or not log_lines:
         return "Summary not available (transformers not installed or no logs provided)."
     
-    combined = "\n".join(log_lines)
-    result = summarizer(combined, max_length=100, min_length=30, do_sample=False)[0]['summary_text']
+    # Repeated lines collapse into one templated line with a count before anything reaches the model
+    result = _map_reduce_summary(summarizer, condense_logs(log_lines))
     
     # Deduplicate repeated sentences
     seen = set()
@@ -32,4 +542,6 @@ def summarize_logs(log_lines):
             seen.add(sent_clean)
             summary_sentences.append(sent_clean)
     
-    return [f"{s.rstrip('.') + '.'}".strip("•○–- ").strip() for s in summary_sentences]
\ No newline at end of file
+    summary = [f"{s.rstrip('.') + '.'}".strip("•○–- ").strip() for s in summary_sentences]
+    summary_cache.put("log_summary", summary_key(log_lines, trace_id), json.dumps(summary))
+    return summary
@@ -0,0 +1,89 @@
+import re
+
+# Variable parts of a log line, masked before lines are compared
+MASKS = [
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<UUID>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<IP>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<HEX>"),
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?Z?\b"), "<TS>"),
+    (re.compile(r"(?<![A-Za-z])[-+]?\d+(?:\.\d+)?(?:%|ms|s|MB|GB|KB)?(?![A-Za-z])"), "<NUM>"),
+]
+WILDCARD = "<*>"
+SIMILARITY_THRESHOLD = 0.5
+# Distinct values kept per template position when condensing
+MAX_VALUES = 5
+
+def mask_line(line):
+    for pattern, token in MASKS:
+        line = pattern.sub(token, line)
+    return line
+
+# Drain-style online template miner: lines are bucketed by token count and first token, and a
+# line joins the most similar template in its bucket (share of equal tokens >= threshold).
+# Positions where members disagree become <*>.
+class TemplateMiner:
+
+    def __init__(self, similarity_threshold=SIMILARITY_THRESHOLD):
+        self.similarity_threshold = similarity_threshold
+        self.buckets = {}
+        self.clusters = []  # dicts: tokens, values, count, example, first_seen
+
+    def add(self, line):
+        # Masked per token, so every template position maps back to the raw token it came from
+        raw = line.split()
+        tokens = [mask_line(token) for token in raw]
+        key = (len(tokens), tokens[0] if tokens and not tokens[0].startswith("<") else WILDCARD)
+        bucket = self.buckets.setdefault(key, [])
+
+        best, best_score = None, -1.0
+        for cluster in bucket:
+            score = self._similarity(cluster["tokens"], tokens)
+            if score > best_score:
+                best, best_score = cluster, score
+
+        if best is None or best_score < self.similarity_threshold:
+            best = {"tokens": tokens, "values": [{} for _ in tokens], "count": 0, "example": line, "first_seen": len(self.clusters)}
+            bucket.append(best)
+            self.clusters.append(best)
+        else:
+            best["tokens"] = [a if a == b else WILDCARD for a, b in zip(best["tokens"], tokens)]
+        for values, token in zip(best["values"], raw):
+            if len(values) <= MAX_VALUES:
+                values.setdefault(token, None)
+        best["count"] += 1
+        return best
+
+    def _similarity(self, template, tokens):
+        if not tokens:
+            return 1.0
+        return sum(a == b or a == WILDCARD for a, b in zip(template, tokens)) / len(tokens)
+
+def mine_templates(lines):
+    # Templates in order of first appearance, with how many lines each one covers
+    miner = TemplateMiner()
+    for line in lines:
+        if line and line.strip():
+            miner.add(line.strip())
+    return [
+        {"template": " ".join(c["tokens"]), "values": [list(v) for v in c["values"]], "count": c["count"], "example": c["example"]}
+        for c in miner.clusters
+    ]
+
+def render_template(values):
+    # Positions where the lines agree keep their text; elsewhere list the distinct values seen
+    parts = []
+    for seen in values:
+        if len(seen) == 1:
+            parts.append(seen[0])
+        else:
+            more = "|..." if len(seen) > MAX_VALUES else ""
+            parts.append("{" + "|".join(seen[:MAX_VALUES]) + more + "}")
+    return " ".join(parts)
+
+def condense_logs(lines):
+    # One line per template with its variable values spelled out, so e.g. a single 500 among
+    # 200s stays visible; the count keeps the weight
+    return [
+        t["example"] if t["count"] == 1 else f"{render_template(t['values'])} (occurred {t['count']} times)"
+        for t in mine_templates(lines)
+    ]
@@ -0,0 +1,202 @@
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from app import inference_client, local_inference
+
+# Every heavy model the app uses, loaded on first use and shared by all modules and sessions.
+# approx_mb (fp32 weights) is only used to plan evictions before a model's first load.
+MODEL_SPECS = {
+    "rca_generator": {"task": "text2text-generation", "model": "MBZUAI/LaMini-Flan-T5-783M", "approx_mb": 3100},
+    "doc_summarizer": {"task": "summarization", "model": "facebook/bart-large-cnn", "approx_mb": 1630},
+    "log_summarizer": {"task": "summarization", "model": "sshleifer/distilbart-cnn-12-6", "approx_mb": 1230},
+    "embedder": {"task": "sentence-embedding", "model": "all-MiniLM-L6-v2", "approx_mb": 90},
+}
+
+# 0 means unlimited; otherwise least-recently-used models are evicted to stay under it
+MEMORY_BUDGET_MB = float(os.getenv("IPE_MODEL_MEMORY_BUDGET_MB", "0"))
+
+# Set from IPE_INFERENCE_URL: hand out thin clients to the shared inference server instead of loading locally
+REMOTE_URL = inference_client.INFERENCE_URL
+
+_models = OrderedDict()  # name -> model, least recently used first
+_sizes = {}              # name -> measured footprint in MB, kept after eviction
+_stats = {}
+_locks = {}
+_registry_lock = threading.Lock()
+_pool_stats = {"evictions": 0, "reloads": 0, "reload_seconds": 0.0}
+_remote_models = {}
+
+def register_model(name, task, model, approx_mb=500):
+    with _registry_lock:
+        MODEL_SPECS.setdefault(name, {"task": task, "model": model, "approx_mb": approx_mb})
+    return name
+
+def embedder_name(model_name):
+    if model_name == MODEL_SPECS["embedder"]["model"]:
+        return "embedder"
+    return register_model(f"embedder:{model_name}", "sentence-embedding", model_name)
+
+def _load(spec):
+    # fp32 PyTorch, int8 or ONNX Runtime depending on IPE_LOCAL_INFERENCE
+    return local_inference.load_local_model(spec)
+
+def _tensor_bytes(value, seen):
+    if isinstance(value, (tuple, list)):
+        return sum(_tensor_bytes(v, seen) for v in value)
+    if not hasattr(value, "element_size") or id(value) in seen:
+        return 0
+    seen.add(id(value))
+    return value.numel() * value.element_size()
+
+def model_footprint_mb(model):
+    # Bytes in the state dict of the underlying torch module (pipeline.model or the SentenceTransformer
+    # itself): parameters, buffers and the packed weights of int8 dynamic-quantized Linear layers,
+    # which aren't parameters. Tied weights are counted once.
+    module = getattr(model, "model", model)
+    try:
+        state = module.state_dict(keep_vars=True)
+    except AttributeError:
+        return None
+    seen = set()
+    return sum(_tensor_bytes(value, seen) for value in state.values()) / (1024 * 1024)
+
+def resident_memory_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _estimated_mb(name):
+    return _sizes.get(name, MODEL_SPECS[name].get("approx_mb", 0))
+
+def _make_room(name):
+    # Caller holds _registry_lock. In-flight calls keep their own reference to an evicted
+    # model, so eviction is safe; the memory is released once they finish.
+    if not MEMORY_BUDGET_MB:
+        return
+    needed = _estimated_mb(name)
+    while _models and sum(_sizes.get(n, _estimated_mb(n)) for n in _models) + needed > MEMORY_BUDGET_MB:
+        victim, _ = _models.popitem(last=False)
+        _pool_stats["evictions"] += 1
+        _stats[victim]["evictions"] += 1
+        _stats[victim]["loaded"] = False
+        print(f"♻️ Evicted {MODEL_SPECS[victim]['model']} to stay within {MEMORY_BUDGET_MB:.0f} MB")
+    gc.collect()
+    if needed > MEMORY_BUDGET_MB:
+        print(f"⚠️ {MODEL_SPECS[name]['model']} (~{needed:.0f} MB) alone exceeds the model memory budget")
+
+def get_model(name):
+    if REMOTE_URL:
+        if name not in MODEL_SPECS:
+            raise KeyError(f"Unknown model: {name}")
+        return _remote_models.setdefault(name, inference_client.remote_model(name, MODEL_SPECS[name]["task"]))
+
+    with _registry_lock:
+        model = _models.get(name)
+        if model is not None:
+            _models.move_to_end(name)
+            return model
+
+    with _registry_lock:
+        if name not in MODEL_SPECS:
+            raise KeyError(f"Unknown model: {name}")
+        lock = _locks.setdefault(name, threading.Lock())
+
+    # Per-model lock: concurrent first callers wait for one load instead of loading twice
+    with lock:
+        model = _models.get(name)
+        if model is not None:
+            return model
+        spec = MODEL_SPECS[name]
+        with _registry_lock:
+            _make_room(name)
+        print(f"🔄 Loading {spec['model']}...")
+        rss_before = resident_memory_mb()
+        start = time.perf_counter()
+        model = _load(spec)
+        load_seconds = time.perf_counter() - start
+        rss_delta = resident_memory_mb() - rss_before
+
+        with _registry_lock:
+            # RSS delta is approximate when several models load at the same time, so prefer the tensor footprint
+            _sizes[name] = model_footprint_mb(model) or (rss_delta if rss_delta > 0 else spec.get("approx_mb", 0))
+            stats = _stats.setdefault(name, {"model": spec["model"], "loads": 0, "evictions": 0})
+            stats.update({
+                "backend": getattr(model, "local_backend", None) or spec.get("backend") or local_inference.LOCAL_INFERENCE,
+                "loaded": True,
+                "loads": stats["loads"] + 1,
+                "load_seconds": round(load_seconds, 2),
+                "memory_mb": round(_sizes[name], 1),
+                "rss_delta_mb": round(rss_delta, 1),
+                "loaded_at": time.time(),
+            })
+            if stats["loads"] > 1:
+                _pool_stats["reloads"] += 1
+                _pool_stats["reload_seconds"] += load_seconds
+            _models[name] = model
+        print(f"✅ Loaded {spec['model']} in {stats['load_seconds']}s")
+        return model
+
+def is_loaded(name):
+    return name in _models or (bool(REMOTE_URL) and name in _remote_models)
+
+def model_stats():
+    with _registry_lock:
+        return {name: dict(stats) for name, stats in _stats.items()}
+
+def pool_stats():
+    with _registry_lock:
+        reloads = _pool_stats["reloads"]
+        return {
+            "budget_mb": MEMORY_BUDGET_MB or None,
+            "resident_models": list(_models),
+            "used_mb": round(sum(_sizes.get(n, 0) for n in _models), 1),
+            "evictions": _pool_stats["evictions"],
+            "reloads": reloads,
+            "avg_reload_seconds": round(_pool_stats["reload_seconds"] / reloads, 2) if reloads else 0.0,
+        }
+
+def warm_up(names=None, background=True):
+    names = [n for n in (names or MODEL_SPECS) if not is_loaded(n)]
+
+    def load_all():
+        for name in names:
+            try:
+                get_model(name)
+            except Exception as e:
+                print(f"⚠️ Warm-up of {name} failed: {e}")
+
+    if not background:
+        load_all()
+        return None
+    thread = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def configured_warm_up():
+    # IPE_WARMUP_MODELS="embedder,rca_generator" preloads in the background; empty disables
+    names = [n.strip() for n in os.getenv("IPE_WARMUP_MODELS", "embedder").split(",") if n.strip()]
+    return warm_up(names) if names else None
+
+# Stand-in that resolves the shared model on first attribute access or call, so callers
+# can hold a "model" without paying for it until it is actually used.
+class LazyModel:
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_model(self.name), attr)
+
+    def __call__(self, *args, **kwargs):
+        return get_model(self.name)(*args, **kwargs)
+
+def lazy_model(name):
+    return LazyModel(name)
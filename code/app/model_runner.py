@@ -1,18 +1,75 @@
-from transformers import pipeline
-from openai import OpenAI
-
-# ✅ Use a better CPU-friendly model
-hf_model = pipeline(
-    "text2text-generation",
-    model="MBZUAI/LaMini-Flan-T5-783M",
-    device=-1  # CPU
-)
+from openai import AsyncOpenAI, OpenAI
+from app.backend_manager import BackendManager, CircuitBreaker
+from app.batcher import batched_model
+from app.entity_store import topology_entry
+from app.model_registry import get_model
+from app.prompt_builder import Prompt, build_prompt, fit_prompt, section
+from app.response_cache import ResponseCache
+import asyncio
+import hashlib
+import httpx
+import os
+import re
+import threading
+from concurrent.futures import wait
 
 client = OpenAI(OpenAI.api_key)
 
+# Per-call deadlines for OpenAI; no SDK retries, the circuit breaker decides when to try again
+OPENAI_TIMEOUT = float(os.getenv("IPE_OPENAI_TIMEOUT", "20"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("IPE_OPENAI_CONNECT_TIMEOUT", "3"))
+
+# Repeat questions (Streamlit reruns, several engineers asking about the same outage) are served from here.
+# Semantic matching is opt-in: set IPE_CACHE_SEMANTIC_THRESHOLD (e.g. 0.95) to reuse answers to near-identical questions.
+def _embed_for_cache(text):
+    return batched_model("embedder").encode([text], convert_to_numpy=True)[0]
+
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("IPE_CACHE_MAX_ENTRIES", "1000")),
+    ttl_seconds=int(os.getenv("IPE_CACHE_TTL_SECONDS", "86400")),
+    semantic_threshold=float(os.getenv("IPE_CACHE_SEMANTIC_THRESHOLD", "0")) or None,
+    embed_fn=_embed_for_cache,
+)
+
+# Only OpenAI answers are cached: a LaMini fallback answer (OpenAI down, circuit open, hedged away)
+# would otherwise keep being served for the whole TTL after OpenAI is back.
+def cached_response(namespace, prompt, answer, semantic_text=None):
+    # answer() -> (response, "remote" or "local"), as from BackendManager.answer
+    cached = response_cache.get(namespace, prompt, semantic_text)
+    if cached is not None:
+        return cached
+    response, backend = answer()
+    if backend == "remote":
+        response_cache.put(namespace, prompt, response, semantic_text)
+    return response
+
+def cached_stream(namespace, prompt, stream, semantic_text=None):
+    # stream() returns False when its answer shouldn't be cached: cut off after some tokens, or from the fallback
+    cached = response_cache.get(namespace, prompt, semantic_text)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    tokens = stream()
+    while True:
+        try:
+            token = next(tokens)
+        except StopIteration as done:
+            complete = done.value is not False
+            break
+        parts.append(token)
+        yield token
+    if complete:
+        response_cache.put(namespace, prompt, "".join(parts), semantic_text)
+
+def response_cache_stats():
+    return response_cache.stats()
+
 def huggingface_generate_response(prompt):
     print("🔄 Generating response using Hugging Face model...")
-    truncated = prompt[:1100]  # LaMini is more compact, this is usually enough
+    truncated = fit_prompt(prompt, "local")  # LaMini reads at most 512 tokens
+    # ✅ CPU-friendly LaMini-Flan-T5, loaded on first fallback and shared across sessions
+    hf_model = batched_model("rca_generator")
     result = hf_model(
         truncated,
         max_length=512,
@@ -23,6 +80,120 @@ def huggingface_generate_response(prompt):
     output = result[0]['generated_text'].strip()
     return remove_repetitions(output)
 
+def huggingface_stream_response(prompt):
+    print("🔄 Streaming response using Hugging Face model...")
+    truncated = fit_prompt(prompt, "local")
+    hf_model = get_model("rca_generator")
+    if not hasattr(hf_model, "model"):
+        # Remote pipeline (shared inference server): no token stream available, send it in one piece
+        yield huggingface_generate_response(prompt)
+        return
+
+    from transformers import TextIteratorStreamer
+    streamer = TextIteratorStreamer(hf_model.tokenizer, skip_prompt=True, skip_special_tokens=True)
+    inputs = hf_model.tokenizer(truncated, return_tensors="pt")
+    failure = []
+
+    def generate():
+        try:
+            hf_model.model.generate(
+                **inputs,
+                streamer=streamer,
+                max_length=512,
+                do_sample=True,
+                temperature=0.7,
+                top_p=0.9
+            )
+        except Exception as e:
+            # Without the end signal the consumer would wait on the streamer forever
+            failure.append(e)
+            streamer.end()
+
+    generation = threading.Thread(target=generate, daemon=True)
+    generation.start()
+    yield from remove_streamed_repetitions(streamer)
+    if failure:
+        raise failure[0]
+
+def remove_streamed_repetitions(tokens):
+    # Streaming counterpart of remove_repetitions: release text line by line, skipping repeated lines
+    seen = set()
+    buffer = ""
+    for token in tokens:
+        buffer += token
+        while "\n" in buffer:
+            line, buffer = buffer.split("\n", 1)
+            if line.strip() not in seen:
+                seen.add(line.strip())
+                yield line + "\n"
+    if buffer and buffer.strip() not in seen:
+        yield buffer
+
+def _open_openai_stream(prompt, temperature):
+    # The stream and its first piece of text (None if it ended without any)
+    stream = _openai_client().chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=temperature,
+        stream=True
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            return stream, chunk.choices[0].delta.content
+    return stream, None
+
+def _settle_hedged_stream(opening):
+    # An OpenAI stream we stopped waiting for still reports to the breaker, then is closed unread
+    if opening.exception() is not None:
+        generation_backend.record(False)
+        return
+    generation_backend.record(True)
+    opening.result()[0].close()
+
+def stream_openai_completion(prompt, temperature):
+    if not generation_backend.breaker.allow():
+        generation_backend.record_fallback(skipped_open_circuit=True)
+        yield from huggingface_stream_response(prompt)
+        return False
+
+    # The hedge budget applies to the time to first token: past it, LaMini streams the answer instead
+    opening = generation_backend.executor.submit(_open_openai_stream, prompt, temperature)
+    done, _ = wait([opening], timeout=generation_backend.hedge_after_seconds or None)
+    if opening not in done:
+        print(f"⏪ No OpenAI token after {generation_backend.hedge_after_seconds}s, streaming from Hugging Face model...")
+        generation_backend.record_hedge()
+        opening.add_done_callback(_settle_hedged_stream)
+        yield from huggingface_stream_response(prompt)
+        return False
+
+    started = False
+    recorded = False
+    try:
+        stream, first = opening.result()
+        if first is not None:
+            started = True
+            yield first
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                started = True
+                yield chunk.choices[0].delta.content
+        generation_backend.record(True)
+        recorded = True
+    except Exception as e:
+        print(f"⚠️ OpenAI stream failed: {e}")
+        generation_backend.record(False)
+        recorded = True
+        if started:
+            return False  # part of the answer is already on screen; don't append a second one
+        print("⏪ Falling back to Hugging Face model...")
+        generation_backend.record_fallback()
+        yield from huggingface_stream_response(prompt)
+        return False
+    finally:
+        if not recorded:
+            # Abandoned mid-stream (rerun, generator.close()): free a half-open trial slot
+            generation_backend.release()
+
 def remove_repetitions(text):
     lines = text.splitlines()
     seen = set()
@@ -33,17 +204,12 @@ def remove_repetitions(text):
             seen.add(line.strip())
     return "\n".join(clean_lines)
 
-def generate_root_cause_analysis(query, similar_df):
-    summary = "\n".join([
-        f"Incident {row['incident_id']}: {row['description']} | Resolution: {row['resolution']} | Cause: {row['cause']}"
-        for _, row in similar_df.head(3).iterrows()
-    ])
+RCA_INSTRUCTIONS = """You are a highly skilled SRE assistant. Based on the following issue and similar incidents, infer the root cause, recommend a 3-step resolution plan, and provide 2 preventive suggestions.
+Even if individual incidents differ slightly, identify any **common failure patterns** that could explain the issue. Avoid rejecting incidents unless they are clearly unrelated.
 
-    if len(summary) > 800:
-        summary = summary[:800] + "..."
+Your output should **not copy any one incident**. Look for patterns and summarize."""
 
-    few_shot_example = """
-Example:
+RCA_FEW_SHOT = """Example:
 
 Issue:
 Intermittent connectivity to backend
@@ -65,87 +231,181 @@ Backend connectivity was failing due to a combination of stale DNS and unoptimiz
 **Preventive Suggestions**:
 1. Set up alerts for increased packet drops or timeout errors.
 2. Automate stale route detection via periodic probes.
----
-"""
-
-    prompt = f"""
-You are a highly skilled SRE assistant. Based on the following issue and similar incidents, infer the root cause, recommend a 3-step resolution plan, and provide 2 preventive suggestions.
-Even if individual incidents differ slightly, identify any **common failure patterns** that could explain the issue. Avoid rejecting incidents unless they are clearly unrelated.
-
-Your output should **not copy any one incident**. Look for patterns and summarize.
+---"""
 
-{few_shot_example}
+def _rca_prompt(query, similar_df):
+    # Incidents arrive most similar first, so the least similar are the ones trimmed to fit the budget.
+    # The few-shot block is the first thing dropped for small-context backends (LaMini).
+    incidents = [
+        f"Incident {row['incident_id']}: {row['description']} | Resolution: {row['resolution']} | Cause: {row['cause']}"
+        for _, row in similar_df.head(3).iterrows()
+    ]
+    prompt = build_prompt([
+        section("fixed", RCA_INSTRUCTIONS),
+        section("optional", RCA_FEW_SHOT),
+        section("question", query, header="Now apply the same logic to this:\n\n### Issue:\n"),
+        section("context", items=incidents, header="### Similar Incidents:\n"),
+        section("fixed", "Respond with the **Probable Root Cause**, a **Resolution Plan** and **Preventive Suggestions**:"),
+    ])
+    return prompt, prompt.context
 
-Now apply the same logic to this:
+def generate_root_cause_analysis(query, similar_df):
+    prompt, summary = _rca_prompt(query, similar_df)
+
+    def answer():
+        return generation_backend.answer(prompt, temperature=0.3)
+
+    return cached_response("rca", prompt, answer, semantic_text=f"{query}\n{summary}")
+
+def stream_root_cause_analysis(query, similar_df):
+    # Yields the RCA as it is generated so the UI can render tokens immediately
+    prompt, summary = _rca_prompt(query, similar_df)
+    return cached_stream("rca", prompt, lambda: stream_openai_completion(prompt, 0.3), semantic_text=f"{query}\n{summary}")
+
+
+# ---------------------------- ASYNC OPENAI CLIENT -----------------------------
+
+# One long-lived event loop thread owns the AsyncOpenAI client, so its pooled keep-alive
+# connections are reused across Streamlit reruns instead of being tied to a throwaway loop.
+_async_loop = None
+_async_client = None
+_async_lock = threading.Lock()
+
+def _event_loop():
+    global _async_loop
+    with _async_lock:
+        if _async_loop is None:
+            _async_loop = asyncio.new_event_loop()
+            threading.Thread(target=_async_loop.run_forever, name="genai-async", daemon=True).start()
+    return _async_loop
+
+def _get_async_client():
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(
+            api_key=client.api_key,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+            ),
+        )
+    return _async_client
 
-### Issue:
-{query}
+def run_async(coro):
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop()).result()
 
-### Similar Incidents:
-{summary}
+# ---------------------------- GENERATION BACKENDS -----------------------------
 
-Respond in the same format as the example:
-"""
+def _openai_client():
+    return client.with_options(
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+        max_retries=0,
+    )
 
+def openai_complete(prompt, temperature=0.4):
+    response = _openai_client().chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=temperature
+    )
+    return response.choices[0].message.content
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3
-        )
-        return response.choices[0].message.content
+async def aopenai_complete(prompt, temperature=0.4):
+    response = await _get_async_client().chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=temperature
+    )
+    return response.choices[0].message.content
+
+# OpenAI first, LaMini as fallback. After IPE_BREAKER_FAILURES consecutive failures OpenAI is skipped
+# for IPE_BREAKER_COOLDOWN seconds (air-gapped nodes stop paying the connect timeout on every call).
+# IPE_HEDGE_AFTER_SECONDS > 0 starts LaMini in parallel once OpenAI is slower than that budget; streamed
+# answers switch to LaMini when OpenAI's first token takes longer than that.
+generation_backend = BackendManager(
+    remote=openai_complete,
+    local=huggingface_generate_response,
+    remote_async=aopenai_complete,
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("IPE_BREAKER_FAILURES", "3")),
+        cooldown_seconds=float(os.getenv("IPE_BREAKER_COOLDOWN", "60")),
+    ),
+    hedge_after_seconds=float(os.getenv("IPE_HEDGE_AFTER_SECONDS", "0")),
+)
 
-    except Exception as e:
-        print(f"⚠️ OpenAI call failed: {e}")
-        print("⏪ Falling back to Hugging Face model...")
-        return huggingface_generate_response(prompt)
-    
+def backend_health():
+    return generation_backend.health()
 
 # ---------------------------- GENAI NETWORK HELPERS -----------------------------
 
-def generate_genai_response(prompt, network_data):
-    dot_text = "\n".join([
+def _network_prompt(prompt, network_data):
+    lines = [
         f"App: {entry['app']} connects to {[api['connects_to'] for api in entry['api_flows']]}"
         for entry in network_data
+    ]
+    context = "Here is a network topology:\n" + "\n".join(lines) + "\n"
+    # Semantic hits only match questions asked against the same topology
+    namespace = "genai:" + hashlib.sha1(context.encode("utf-8")).hexdigest()[:12]
+    if isinstance(prompt, Prompt):
+        return prompt, namespace  # already assembled within budget (e.g. a KB question)
+
+    # Apps named in the question go first so they survive if the topology has to be trimmed
+    words = set(re.findall(r"[\w-]+", prompt))
+    mentioned = [entry["app"] in words for entry in network_data]
+    full_prompt = build_prompt([
+        section("context", items=[l for l, m in zip(lines, mentioned) if m] + [l for l, m in zip(lines, mentioned) if not m],
+                header="Here is a network topology:\n"),
+        section("question", f"Question: {prompt}"),
+        section("fixed", "Answer with clarity and structure."),
     ])
-    context = f"Here is a network topology:\n{dot_text}\n"
+    return full_prompt, namespace
 
-    full_prompt = f"{context}\nQuestion: {prompt}\nAnswer with clarity and structure."
+def generate_genai_response(prompt, network_data):
+    full_prompt, namespace = _network_prompt(prompt, network_data)
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": full_prompt}],
-            temperature=0.4
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        print(f"OpenAI failed: {e}, falling back to Hugging Face")
-        return huggingface_generate_response(full_prompt)
+    def answer():
+        return generation_backend.answer(full_prompt, temperature=0.4)
 
-def describe_network(app_name, network_data):
-    deps = next((entry for entry in network_data if entry["app"] == app_name), None)
+    return cached_response(namespace, full_prompt, answer, semantic_text=prompt)
+
+def stream_genai_response(prompt, network_data):
+    full_prompt, namespace = _network_prompt(prompt, network_data)
+    return cached_stream(namespace, full_prompt, lambda: stream_openai_completion(full_prompt, 0.4), semantic_text=prompt)
+
+async def agenerate_genai_response(prompt, network_data):
+    full_prompt, namespace = _network_prompt(prompt, network_data)
+    loop = asyncio.get_running_loop()
+    # Cache lookups may embed the prompt, so keep them off the event loop
+    cached = await loop.run_in_executor(None, response_cache.get, namespace, full_prompt, prompt)
+    if cached is not None:
+        return cached
+
+    result, backend = await generation_backend.aanswer(full_prompt, temperature=0.4)
+    if backend == "remote":
+        await loop.run_in_executor(None, response_cache.put, namespace, full_prompt, result, prompt)
+    return result
+
+def _describe_prompt(app_name, network_data):
+    deps = topology_entry(network_data, app_name)
     if not deps:
-        return "No network data available."
+        return None
     deps_list = [api['connects_to'] for api in deps["api_flows"]]
-    prompt = f"Describe in one paragraph what the system '{app_name}' does, given it connects to: {', '.join(deps_list)}"
-    return generate_genai_response(prompt, network_data)
+    return f"Describe in one paragraph what the system '{app_name}' does, given it connects to: {', '.join(deps_list)}"
 
-def suggest_missing_connections(app_name, network_data):
-    all_apps = [entry["app"] for entry in network_data if entry["app"] != app_name]
-    prompt = f"What other systems might '{app_name}' need to connect to that are not currently defined?"
-    return generate_genai_response(prompt, network_data)
+def _missing_connections_prompt(app_name):
+    return f"What other systems might '{app_name}' need to connect to that are not currently defined?"
 
-def answer_rca_question(question, app_name, network_data):
-    app_entry = next((entry for entry in network_data if entry["app"] == app_name), None)
+def _rca_question_prompt(question, app_name, network_data):
+    # Returns (error message, prompt); exactly one of them is set
+    app_entry = topology_entry(network_data, app_name)
     deps_list = [api['connects_to'] for api in app_entry["api_flows"]] if app_entry else []
     all_apps = [entry["app"] for entry in network_data]
 
     # Detect unknown targets in the user question
     unknown_targets = [word for word in question.split() if word.isupper() and word not in all_apps]
     if unknown_targets:
-        return f"⚠️ Unknown system(s) mentioned: {', '.join(unknown_targets)}. Please check the system name(s)."
+        return f"⚠️ Unknown system(s) mentioned: {', '.join(unknown_targets)}. Please check the system name(s).", None
 
     context = (
         f"'{app_name}' is connected to: {', '.join(deps_list)}. "
@@ -153,5 +413,42 @@ def answer_rca_question(question, app_name, network_data):
         "If the question involves unknown systems or invalid references, respond accordingly."
     )
 
-    full_question = f"{context}\n\n{question}"
+    return None, f"{context}\n\n{question}"
+
+def describe_network(app_name, network_data):
+    prompt = _describe_prompt(app_name, network_data)
+    if not prompt:
+        return "No network data available."
+    return generate_genai_response(prompt, network_data)
+
+def suggest_missing_connections(app_name, network_data):
+    return generate_genai_response(_missing_connections_prompt(app_name), network_data)
+
+def answer_rca_question(question, app_name, network_data):
+    error, full_question = _rca_question_prompt(question, app_name, network_data)
+    if error:
+        return error
     return generate_genai_response(full_question, network_data)
+
+async def _gather_network_insights(app_name, network_data, question):
+    async def describe():
+        prompt = _describe_prompt(app_name, network_data)
+        return await agenerate_genai_response(prompt, network_data) if prompt else "No network data available."
+
+    async def answer():
+        if not question:
+            return None
+        error, full_question = _rca_question_prompt(question, app_name, network_data)
+        return error or await agenerate_genai_response(full_question, network_data)
+
+    description, suggestions, answer_text = await asyncio.gather(
+        describe(),
+        agenerate_genai_response(_missing_connections_prompt(app_name), network_data),
+        answer(),
+    )
+    return {"description": description, "suggestions": suggestions, "answer": answer_text}
+
+def gather_network_insights(app_name, network_data, question=None):
+    # Description, missing-connection suggestions and the optional RCA answer are independent,
+    # so issue them concurrently: the NetViz card waits for the slowest call, not the sum.
+    return run_async(_gather_network_insights(app_name, network_data, question))
@@ -1,4 +1,5 @@
 import graphviz
+from app.entity_store import inbound_flows, topology_entry
 
 def generate_dot(app_name, network_data, api_filter=None):
     dot = graphviz.Digraph(comment=f'Full Network View for {app_name}')
@@ -7,7 +8,7 @@ def generate_dot(app_name, network_data, api_filter=None):
     dot.node(app_name, shape="box", style="filled", color="lightblue")
 
     # Show outbound connections
-    app_entry = next((item for item in network_data if item["app"] == app_name), None)
+    app_entry = topology_entry(network_data, app_name)
     if app_entry:
         for api in app_entry["api_flows"]:
             target = api["connects_to"]
@@ -18,15 +19,11 @@ def generate_dot(app_name, network_data, api_filter=None):
             dot.edge(app_name, target, label=label)
 
     # Show inbound connections (other apps connecting to this one)
-    for other in network_data:
-        if other["app"] == app_name:
+    for other_app, api in inbound_flows(network_data, app_name):
+        label = api["api"]
+        if api_filter and api_filter != label:
             continue
-        for api in other["api_flows"]:
-            if api["connects_to"] == app_name:
-                label = api["api"]
-                if api_filter and api_filter != label:
-                    continue
-                dot.node(other["app"], shape="ellipse", style="filled", color="lightgray")
-                dot.edge(other["app"], app_name, label=label)
+        dot.node(other_app, shape="ellipse", style="filled", color="lightgray")
+        dot.edge(other_app, app_name, label=label)
 
     return dot.source
\ No newline at end of file
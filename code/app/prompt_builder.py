@@ -0,0 +1,166 @@
+import math
+import os
+import re
+import threading
+from functools import lru_cache
+
+from app.model_registry import MODEL_SPECS
+
+# Input token budgets per generation backend. LaMini-Flan-T5 (T5 encoder) sees at most 512
+# input tokens; the OpenAI budget caps cost and latency per call, not the model's context.
+TOKEN_BUDGETS = {
+    "openai": int(os.getenv("IPE_PROMPT_TOKENS_OPENAI", "3000")),
+    "local": int(os.getenv("IPE_PROMPT_TOKENS_LOCAL", "512")),
+}
+OPENAI_MODEL = "gpt-3.5-turbo"
+# A context item is only trimmed to fit if at least this many tokens of it survive
+MIN_PARTIAL_TOKENS = 24
+
+_tokenizers = {}
+_tokenizer_lock = threading.Lock()
+
+def _tokenizer(backend):
+    # None means "no tokenizer installed": fall back to the ~4 characters per token rule of thumb
+    with _tokenizer_lock:
+        if backend not in _tokenizers:
+            try:
+                if backend == "openai":
+                    import tiktoken
+                    _tokenizers[backend] = tiktoken.encoding_for_model(OPENAI_MODEL)
+                else:
+                    # "local" is the LaMini fallback; any other backend is a model registry name
+                    from transformers import AutoTokenizer
+                    name = "rca_generator" if backend == "local" else backend
+                    _tokenizers[backend] = AutoTokenizer.from_pretrained(MODEL_SPECS[name]["model"])
+            except Exception as e:
+                print(f"⚠️ No {backend} tokenizer available ({e}), approximating token counts")
+                _tokenizers[backend] = None
+        return _tokenizers[backend]
+
+# Static parts (instructions, the few-shot example) and recurring incidents are tokenized once
+@lru_cache(maxsize=4096)
+def _token_ids(text, backend):
+    tokenizer = _tokenizer(backend)
+    if tokenizer is None:
+        return None
+    if backend == "openai":
+        return tuple(tokenizer.encode(text))
+    return tuple(tokenizer.encode(text, add_special_tokens=False))
+
+def count_tokens(text, backend="openai"):
+    if not text:
+        return 0
+    ids = _token_ids(text, backend)
+    return len(ids) if ids is not None else math.ceil(len(text) / 4)
+
+def truncate_tokens(text, max_tokens, backend="openai"):
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, backend) <= max_tokens:
+        return text
+    ids = _token_ids(text, backend)
+    if ids is None:
+        return text[:max_tokens * 4 - 3] + "..."
+    return _tokenizer(backend).decode(list(ids[:max_tokens - 1])) + "..."
+
+# A prompt is a list of sections rendered in order and joined by blank lines:
+#   fixed     instructions / formatting, always kept
+#   question  the user's question, always kept (trimmed only if it alone overflows the budget)
+#   context   ranked items (incidents, KB chunks), most relevant first, added until the budget is spent
+#   optional  e.g. the few-shot example, added only if it still fits after the context
+def section(kind, text="", items=None, header="", separator="\n"):
+    return {"kind": kind, "text": text, "items": list(items or []), "header": header, "separator": separator}
+
+# The built prompt is a plain string (cache keys, OpenAI payloads) that remembers its sections,
+# so the local fallback can re-fit the same prompt to its smaller budget instead of cutting it blindly.
+class Prompt(str):
+    sections = None
+    context = ""
+
+def _render(sections, chosen):
+    parts = []
+    for i, sec in enumerate(sections):
+        if sec["kind"] == "context":
+            if chosen[i]:
+                parts.append(sec["header"] + sec["separator"].join(chosen[i]))
+        elif chosen[i]:
+            parts.append(sec["header"] + chosen[i])
+    return "\n\n".join(parts)
+
+def build_prompt(sections, backend="openai", budget=None):
+    budget = budget or TOKEN_BUDGETS[backend]
+    chosen = [None] * len(sections)
+    remaining = budget
+
+    for i, sec in enumerate(sections):
+        if sec["kind"] in ("fixed", "question"):
+            chosen[i] = sec["text"]
+            remaining -= count_tokens(sec["header"] + sec["text"], backend) + 2
+    if remaining < 0:
+        # Even the bare question overflows: keep the instructions and shorten the question
+        for i, sec in enumerate(sections):
+            if sec["kind"] == "question":
+                keep = count_tokens(sec["text"], backend) + remaining
+                chosen[i] = truncate_tokens(sec["text"], max(keep, MIN_PARTIAL_TOKENS), backend)
+        remaining = 0
+
+    for i, sec in enumerate(sections):
+        if sec["kind"] != "context" or not sec["items"]:
+            continue
+        taken = []
+        remaining -= count_tokens(sec["header"], backend) + 2
+        for item in sec["items"]:
+            cost = count_tokens(item, backend) + 1
+            if cost <= remaining:
+                taken.append(item)
+                remaining -= cost
+            else:
+                if remaining >= MIN_PARTIAL_TOKENS:
+                    taken.append(truncate_tokens(item, remaining - 1, backend))
+                    remaining = 0
+                break
+        chosen[i] = taken
+
+    for i, sec in enumerate(sections):
+        if sec["kind"] == "optional":
+            cost = count_tokens(sec["header"] + sec["text"], backend) + 2
+            if cost <= remaining:
+                chosen[i] = sec["text"]
+                remaining -= cost
+
+    # Section costs are counted separately; drop trailing context if joining pushed us over
+    text = _render(sections, chosen)
+    while count_tokens(text, backend) > budget and any(c for s, c in zip(sections, chosen) if s["kind"] == "context"):
+        i = max(i for i, s in enumerate(sections) if s["kind"] == "context" and chosen[i])
+        chosen[i] = chosen[i][:-1]
+        text = _render(sections, chosen)
+
+    prompt = Prompt(text)
+    prompt.sections = sections
+    prompt.context = "\n".join(item for s, c in zip(sections, chosen) if s["kind"] == "context" for item in c or [])
+    return prompt
+
+def fit_prompt(prompt, backend):
+    if isinstance(prompt, Prompt) and prompt.sections:
+        return build_prompt(prompt.sections, backend)
+    # Free-form prompt: the question usually comes last, so cut from the middle rather than the end
+    budget = TOKEN_BUDGETS[backend]
+    if count_tokens(prompt, backend) <= budget:
+        return prompt
+    half = budget // 2 - 2
+    ids = _token_ids(prompt, backend)
+    tail = prompt[-half * 4:] if ids is None else _tokenizer(backend).decode(list(ids[-half:]))
+    return f"{truncate_tokens(prompt, half, backend)}\n{tail}"
+
+def rank_chunks(text, question, chunk_chars=600):
+    # Split a document on blank lines (falling back to fixed windows) and order the chunks by
+    # word overlap with the question, so the most relevant ones survive trimming
+    chunks = [c.strip() for c in re.split(r"\n\s*\n", text) if c.strip()]
+    chunks = [c[i:i + chunk_chars] for c in chunks for i in range(0, len(c), chunk_chars)]
+    terms = set(re.findall(r"\w{3,}", question.lower()))
+
+    def score(indexed):
+        words = re.findall(r"\w{3,}", indexed[1].lower())
+        return -sum(w in terms for w in words) / math.sqrt(len(words) or 1), indexed[0]
+
+    return [chunk for _, chunk in sorted(enumerate(chunks), key=score)]
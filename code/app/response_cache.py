@@ -0,0 +1,148 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+RESPONSE_CACHE_PATH = "data/.cache/response_cache.sqlite"
+
+def normalize_prompt(text):
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+def prompt_key(namespace, prompt):
+    return hashlib.sha256(f"{namespace}\x00{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+# LRU + TTL cache for GenAI responses, written through to SQLite so it survives restarts.
+# Lookups try the exact normalized prompt first; if a semantic threshold and embed_fn are
+# set, they then fall back to the most similar cached question in the same namespace.
+class ResponseCache:
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, max_entries=1000, ttl_seconds=86400,
+                 semantic_threshold=None, embed_fn=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic_threshold = semantic_threshold
+        self.embed_fn = embed_fn
+        self.entries = OrderedDict()  # key -> dict(namespace, response, created, embedding)
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.db = None
+        if path:
+            self._open()
+
+    def get(self, namespace, prompt, semantic_text=None):
+        key = prompt_key(namespace, prompt)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and not self._expired(entry):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry["response"]
+            if entry:
+                self._remove(key)
+
+        if self.semantic_threshold and self.embed_fn and semantic_text:
+            embedding = self._embed(semantic_text)
+            with self.lock:
+                match = self._nearest(namespace, embedding)
+                if match:
+                    self.entries.move_to_end(match)
+                    self.semantic_hits += 1
+                    return self.entries[match]["response"]
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, namespace, prompt, response, semantic_text=None):
+        key = prompt_key(namespace, prompt)
+        embedding = None
+        if self.semantic_threshold and self.embed_fn and semantic_text:
+            embedding = self._embed(semantic_text)
+        entry = {"namespace": namespace, "response": response, "created": time.time(), "embedding": embedding}
+
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            if self.db:
+                blob = embedding.tobytes() if embedding is not None else None
+                self.db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (key, namespace, response, entry["created"], blob),
+                )
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+            if self.db:
+                self.db.commit()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.db:
+                self.db.execute("DELETE FROM responses")
+                self.db.commit()
+
+    def _embed(self, text):
+        vector = np.asarray(self.embed_fn(normalize_prompt(text)), dtype="float32").ravel()
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _nearest(self, namespace, embedding):
+        candidates = [
+            (key, entry["embedding"]) for key, entry in self.entries.items()
+            if entry["namespace"] == namespace and entry["embedding"] is not None and not self._expired(entry)
+        ]
+        if not candidates:
+            return None
+        scores = np.stack([vec for _, vec in candidates]) @ embedding
+        best = int(np.argmax(scores))
+        return candidates[best][0] if scores[best] >= self.semantic_threshold else None
+
+    def _expired(self, entry):
+        return self.ttl_seconds and time.time() - entry["created"] > self.ttl_seconds
+
+    def _remove(self, key):
+        self.entries.pop(key, None)
+        if self.db:
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, namespace TEXT, response TEXT, created REAL, embedding BLOB)"
+        )
+        if self.ttl_seconds:
+            self.db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,))
+        self.db.execute(
+            "DELETE FROM responses WHERE key NOT IN (SELECT key FROM responses ORDER BY created DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        rows = self.db.execute(
+            "SELECT key, namespace, response, created, embedding FROM responses ORDER BY created DESC"
+        ).fetchall()
+        for key, namespace, response, created, blob in reversed(rows):
+            embedding = np.frombuffer(blob, dtype="float32") if blob else None
+            self.entries[key] = {"namespace": namespace, "response": response, "created": created, "embedding": embedding}
+        self.db.commit()
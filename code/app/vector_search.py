@@ -1,18 +1,403 @@
-from sentence_transformers import SentenceTransformer
+from app.batcher import batched_model
+from app.data_loader import parsed_dates
+from app.model_registry import embedder_name
+from app.index_factory import build_config_key, make_faiss_index, make_search_params, resolve_index_config, train_if_needed
 import faiss
+import numpy as np
+import pandas as pd
+import hashlib
+import json
+import os
 
-def build_vector_index(df, model_name="all-MiniLM-L6-v2"):
-    model = SentenceTransformer(model_name)
-    embeddings = model.encode(df["combined_text"].tolist(), convert_to_numpy=True)
+INDEX_CACHE_DIR = "data/.cache/vector_index"
+# Rebuild the FAISS index once this share of stored vectors has been tombstoned
+COMPACT_RATIO = 0.2
+# Retrain trained backends (IVF/PQ) once the corpus outgrows the training set by this factor
+RETRAIN_GROWTH = 4
+# Metadata kept next to each vector so searches can be filtered inside FAISS
+FILTER_COLUMNS = ["app", "category", "urgency"]
+# Filtered queries touching at most this many rows scan the subset exactly instead of the ANN index
+EXACT_FILTER_LIMIT = 20000
 
-    dimension = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dimension)
-    index.add(embeddings)
+def compute_fingerprint(df, model_name):
+    # Everything the index stores per incident: its key, text and filter metadata
+    digest = hashlib.sha256(model_name.encode("utf-8"))
+    columns = ["incident_id", "combined_text"] + FILTER_COLUMNS + ["incident_date"]
+    for values in zip(*(df[col].astype(str) if col in df else [""] * len(df) for col in columns)):
+        digest.update("\x1f".join(values).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
 
-    return index, embeddings, model
+def text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
 
-def retrieve_similar_incidents(query_text, model, index, df, top_k=3):
-    query_embedding = model.encode([query_text], convert_to_numpy=True)
-    distances, indices = index.search(query_embedding, top_k)
-    results = df.iloc[indices[0]].copy()
-    return results
\ No newline at end of file
+# FAISS index keyed on incident_id, holding one vector per distinct combined_text. Incidents are
+# rows pointing at a content id (the FAISS id); rows sharing a text share its vector, so only
+# texts not stored yet get encoded. Updating an incident tombstones its row and appends a new one;
+# content no live row references is skipped at search time, and compact() drops dead rows and content.
+class IncidentIndex:
+
+    def __init__(self, dimension, model_name, index_config=None):
+        self.dimension = dimension
+        self.model_name = model_name
+        self.config = resolve_index_config(index_config)
+        self.fingerprint = None
+        self.index = None        # created on first add, since IVF/PQ need training data
+        self.trained_on = 0
+        self.embeddings = np.empty((0, dimension), dtype="float32")  # content id -> vector
+        self.content_hashes = []  # content id -> hash of combined_text
+        self.hash_to_content = {} # text hash -> content id, for content still referenced
+        self.refcounts = np.empty(0, dtype="int64")  # content id -> live rows using it
+        self.members = {}         # content id -> live row ids, in insertion order
+        self.keys = []            # row id -> incident_id
+        self.row_content = np.empty(0, dtype="int64")
+        self.live = np.empty(0, dtype=bool)
+        self.key_to_id = {}       # incident_id -> live row id
+        self.vocab = {col: [] for col in FILTER_COLUMNS}
+        self.codes = {col: np.empty(0, dtype="int32") for col in FILTER_COLUMNS}
+        self.dates = np.empty(0, dtype="datetime64[D]")
+
+    @property
+    def ntotal(self):
+        return len(self.key_to_id)
+
+    @property
+    def ncontent(self):
+        return len(self.hash_to_content)
+
+    @property
+    def tombstones(self):
+        return len(self.keys) - len(self.key_to_id)
+
+    @property
+    def dead_content(self):
+        return len(self.content_hashes) - len(self.hash_to_content)
+
+    def text_hash(self, incident_id):
+        row = self.key_to_id.get(incident_id)
+        return None if row is None else self.content_hashes[self.row_content[row]]
+
+    def upsert(self, rows, model):
+        rows = rows.drop_duplicates("incident_id", keep="last")
+        keys = rows["incident_id"].tolist()
+        texts = rows["combined_text"].tolist()
+        hashes = [text_hash(t) for t in texts]
+        stored = [self.text_hash(k) for k in keys]
+        changed = [i for i, h in enumerate(hashes) if stored[i] != h]
+        codes, dates = self._encode_metadata(rows)
+
+        # app and incident_date aren't part of combined_text, so refresh metadata in place for unchanged rows
+        unchanged = np.array([i for i, h in enumerate(hashes) if stored[i] == h], dtype="int64")
+        if len(unchanged):
+            ids = np.array([self.key_to_id[keys[i]] for i in unchanged], dtype="int64")
+            for col in FILTER_COLUMNS:
+                self.codes[col][ids] = codes[col][unchanged]
+            self.dates[ids] = dates[unchanged]
+        if not changed:
+            return 0
+
+        # Encode each text that isn't stored yet once, however many incidents share it
+        new_texts = {}
+        for i in changed:
+            if hashes[i] not in self.hash_to_content:
+                new_texts.setdefault(hashes[i], texts[i])
+        if new_texts:
+            vectors = model.encode(list(new_texts.values()), convert_to_numpy=True).astype("float32")
+            start = len(self.content_hashes)
+            self._add(vectors, np.arange(start, start + len(new_texts), dtype="int64"))
+            self.embeddings = np.vstack([self.embeddings, vectors])
+            self.refcounts = np.concatenate([self.refcounts, np.zeros(len(new_texts), dtype="int64")])
+            for offset, h in enumerate(new_texts):
+                self.content_hashes.append(h)
+                self.hash_to_content[h] = start + offset
+
+        # Reference the new content before releasing the old, so a text moving between incidents keeps its vector
+        content = np.array([self.hash_to_content[hashes[i]] for i in changed], dtype="int64")
+        np.add.at(self.refcounts, content, 1)
+        self._tombstone([keys[i] for i in changed])
+
+        start = len(self.keys)
+        self.row_content = np.concatenate([self.row_content, content])
+        self.live = np.concatenate([self.live, np.ones(len(changed), dtype=bool)])
+        for col in FILTER_COLUMNS:
+            self.codes[col] = np.concatenate([self.codes[col], codes[col][changed]])
+        self.dates = np.concatenate([self.dates, dates[changed]])
+        for offset, i in enumerate(changed):
+            self.keys.append(keys[i])
+            self.key_to_id[keys[i]] = start + offset
+            self.members.setdefault(int(content[offset]), {})[start + offset] = None
+
+        self._maybe_compact()
+        return len(changed)
+
+    def delete(self, incident_ids):
+        removed = self._tombstone(incident_ids)
+        self._maybe_compact()
+        return removed
+
+    def sync(self, df, model):
+        # Bring the index in line with df, encoding only new or changed rows
+        current = set(df["incident_id"])
+        deleted = [key for key in self.key_to_id if key not in current]
+        if deleted:
+            self.delete(deleted)
+        return self.upsert(df, model), len(deleted)
+
+    def compact(self):
+        keep_rows = np.flatnonzero(self.live)
+        keep_content = np.flatnonzero(self.refcounts > 0)
+        remap = np.full(len(self.content_hashes), -1, dtype="int64")
+        remap[keep_content] = np.arange(len(keep_content))
+
+        self.embeddings = self.embeddings[keep_content]
+        self.content_hashes = [self.content_hashes[i] for i in keep_content]
+        self.refcounts = self.refcounts[keep_content]
+        self.hash_to_content = {h: i for i, h in enumerate(self.content_hashes)}
+        self.keys = [self.keys[i] for i in keep_rows]
+        self.row_content = remap[self.row_content[keep_rows]]
+        self.live = np.ones(len(keep_rows), dtype=bool)
+        self.codes = {col: codes[keep_rows] for col, codes in self.codes.items()}
+        self.dates = self.dates[keep_rows]
+        self.key_to_id = {key: i for i, key in enumerate(self.keys)}
+        self._index_members()
+        self.index = None
+        if len(keep_content):
+            self._add(self.embeddings, np.arange(len(keep_content), dtype="int64"))
+
+    def search(self, query_embeddings, top_k, filters=None):
+        # Returns (incident_id lists, distance lists), one pair per query row
+        query_embeddings = np.asarray(query_embeddings, dtype="float32")
+        empty = [[] for _ in query_embeddings], [[] for _ in query_embeddings]
+        if self.index is None:
+            return empty
+
+        mask = self.filter_mask(filters) if filters else self.live
+        candidates = np.count_nonzero(mask)
+        if candidates == 0:
+            return empty
+        top_k = min(top_k, candidates)
+
+        # A vector qualifies if any of its incidents does; top_k vectors always cover top_k incidents
+        if filters:
+            content_mask = np.zeros(len(self.content_hashes), dtype=bool)
+            content_mask[self.row_content[mask]] = True
+        else:
+            content_mask = self.refcounts > 0
+        k = int(min(top_k, np.count_nonzero(content_mask)))
+
+        if filters and np.count_nonzero(content_mask) <= EXACT_FILTER_LIMIT:
+            subset = np.flatnonzero(content_mask)
+            distances, positions = faiss.knn(query_embeddings, self.embeddings[subset], k)
+            ids = np.where(positions >= 0, subset[positions], -1)
+        else:
+            sel = None
+            if filters or self.dead_content:
+                bitmap = np.packbits(content_mask, bitorder="little")
+                sel = faiss.IDSelectorBitmap(len(content_mask), faiss.swig_ptr(bitmap))
+            params = make_search_params(self.index, self.config, sel)
+            distances, ids = self.index.search(query_embeddings, k, params=params)
+
+        # Fan each vector hit out to the (matching) incidents that share it
+        keys, dists = [], []
+        for row_ids, row_dists in zip(ids, distances):
+            hits, hit_dists = [], []
+            for content, dist in zip(row_ids, row_dists):
+                if content < 0 or len(hits) == top_k:
+                    continue
+                for row in self.members.get(int(content), ()):
+                    if mask[row]:
+                        hits.append(self.keys[row])
+                        hit_dists.append(float(dist))
+                        if len(hits) == top_k:
+                            break
+            keys.append(hits)
+            dists.append(hit_dists)
+        return keys, dists
+
+    def filter_mask(self, filters):
+        # filters: {"app": "DBG" | [...], "category": ..., "urgency": ..., "incident_date": (start, end)}
+        mask = self.live.copy()
+        for col, value in filters.items():
+            if value is None:
+                continue
+            if col == "incident_date":
+                start, end = value
+                if start is not None:
+                    mask &= self.dates >= np.datetime64(pd.Timestamp(start), "D")
+                if end is not None:
+                    mask &= self.dates <= np.datetime64(pd.Timestamp(end), "D")
+            elif col in self.codes:
+                values = [value] if isinstance(value, str) else value
+                wanted = [self.vocab[col].index(v) for v in values if v in self.vocab[col]]
+                mask &= np.isin(self.codes[col], wanted)
+            else:
+                raise ValueError(f"Unsupported filter column: {col}")
+        return mask
+
+    def _encode_metadata(self, rows):
+        codes = {}
+        for col in FILTER_COLUMNS:
+            values = rows[col].astype(str).tolist() if col in rows else [""] * len(rows)
+            lookup = {v: i for i, v in enumerate(self.vocab[col])}
+            for v in values:
+                if v not in lookup:
+                    lookup[v] = len(self.vocab[col])
+                    self.vocab[col].append(v)
+            codes[col] = np.array([lookup[v] for v in values], dtype="int32")
+        if "incident_date" in rows:
+            dates = parsed_dates(rows, "incident_date")
+        else:
+            dates = np.full(len(rows), np.datetime64("NaT"), dtype="datetime64[D]")
+        return codes, dates
+
+    def _add(self, vectors, ids):
+        if self.index is None:
+            base = make_faiss_index(self.dimension, self.config, n_train=len(vectors))
+            self.trained_on = 0 if base.is_trained else len(vectors)
+            train_if_needed(base, vectors)
+            self.index = faiss.IndexIDMap2(base)
+        self.index.add_with_ids(vectors, ids)
+
+    def _tombstone(self, incident_ids):
+        removed = 0
+        for key in incident_ids:
+            row = self.key_to_id.pop(key, None)
+            if row is None:
+                continue
+            self.live[row] = False
+            content = int(self.row_content[row])
+            del self.members[content][row]
+            self.refcounts[content] -= 1
+            if self.refcounts[content] == 0:
+                del self.members[content]
+                del self.hash_to_content[self.content_hashes[content]]
+            removed += 1
+        return removed
+
+    def _index_members(self):
+        self.members = {}
+        for row in np.flatnonzero(self.live):
+            self.members.setdefault(int(self.row_content[row]), {})[int(row)] = None
+
+    def _maybe_compact(self):
+        dead_rows = self.tombstones / len(self.keys) if self.keys else 0
+        dead_content = self.dead_content / len(self.content_hashes) if self.content_hashes else 0
+        if max(dead_rows, dead_content) > COMPACT_RATIO:
+            self.compact()
+        elif self.trained_on and len(self.content_hashes) > RETRAIN_GROWTH * self.trained_on:
+            print("🔄 Retraining vector index after corpus growth...")
+            self.compact()
+
+    def save(self, cache_dir=INDEX_CACHE_DIR):
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to temp files first so a crash mid-save never leaves a half-written artifact behind
+        faiss.write_index(self.index, os.path.join(cache_dir, "index.faiss.tmp"))
+        with open(os.path.join(cache_dir, "embeddings.npy.tmp"), "wb") as f:
+            np.save(f, self.embeddings)
+        with open(os.path.join(cache_dir, "live.npy.tmp"), "wb") as f:
+            np.save(f, self.live)
+        with open(os.path.join(cache_dir, "metadata.npz.tmp"), "wb") as f:
+            np.savez(f, dates=self.dates, row_content=self.row_content, **{f"codes_{col}": self.codes[col] for col in FILTER_COLUMNS})
+        with open(os.path.join(cache_dir, "meta.json.tmp"), "w") as f:
+            json.dump({
+                "fingerprint": self.fingerprint,
+                "model_name": self.model_name,
+                "dimension": self.dimension,
+                "index_config": build_config_key(self.config),
+                "trained_on": self.trained_on,
+                "keys": self.keys,
+                "content_hashes": self.content_hashes,
+                "vocab": self.vocab,
+            }, f)
+        for name in ["index.faiss", "embeddings.npy", "live.npy", "metadata.npz", "meta.json"]:
+            os.replace(os.path.join(cache_dir, name + ".tmp"), os.path.join(cache_dir, name))
+        # The raw vectors are only read by filtered exact search and rebuilds; keep them on disk
+        # so a compressed backend (ivf_pq, hnsw) is the only full copy in RAM
+        self.embeddings = np.load(os.path.join(cache_dir, "embeddings.npy"), mmap_mode="r")
+
+    @classmethod
+    def load(cls, model_name, cache_dir=INDEX_CACHE_DIR, index_config=None):
+        meta_path = os.path.join(cache_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            # Caches from before content dedup have no content_hashes and are rebuilt
+            if meta.get("model_name") != model_name or "content_hashes" not in meta:
+                return None
+            store = cls(meta["dimension"], model_name, index_config)
+            store.index = faiss.read_index(os.path.join(cache_dir, "index.faiss"))
+            store.embeddings = np.load(os.path.join(cache_dir, "embeddings.npy"), mmap_mode="r")
+            store.live = np.load(os.path.join(cache_dir, "live.npy"))
+            with np.load(os.path.join(cache_dir, "metadata.npz")) as metadata:
+                store.dates = metadata["dates"]
+                store.row_content = metadata["row_content"]
+                store.codes = {col: metadata[f"codes_{col}"] for col in FILTER_COLUMNS}
+            store.vocab = meta["vocab"]
+        except Exception as e:
+            print(f"⚠️ Could not load cached vector index: {e}")
+            return None
+        store.fingerprint = meta["fingerprint"]
+        store.keys = meta["keys"]
+        store.content_hashes = meta["content_hashes"]
+        store.trained_on = meta.get("trained_on", 0)
+        store.key_to_id = {store.keys[i]: int(i) for i in np.flatnonzero(store.live)}
+        store.refcounts = np.bincount(store.row_content[store.live], minlength=len(store.content_hashes)).astype("int64")
+        store.hash_to_content = {h: i for i, h in enumerate(store.content_hashes) if store.refcounts[i]}
+        store._index_members()
+        if store.index.ntotal != len(store.content_hashes):
+            return None
+        if meta.get("index_config") != build_config_key(store.config):
+            # Backend settings changed: rebuild from the stored embeddings, no re-encoding needed
+            print(f"🔄 Rebuilding vector index as {store.config['backend']}...")
+            store.compact()
+            store.fingerprint = None
+        return store
+
+def build_vector_index(df, model_name="all-MiniLM-L6-v2", cache_dir=INDEX_CACHE_DIR, index_config=None):
+    # The embedder only loads if rows need encoding or a query comes in; concurrent queries are micro-batched
+    model = batched_model(embedder_name(model_name))
+    fingerprint = compute_fingerprint(df, model_name)
+
+    index = IncidentIndex.load(model_name, cache_dir, index_config)
+    if index and index.fingerprint == fingerprint:
+        return index, index.embeddings, model
+
+    if index is None:
+        print("🔄 Building vector index from scratch...")
+        index = IncidentIndex(model.get_sentence_embedding_dimension(), model_name, index_config)
+    upserted, deleted = index.sync(df, model)
+    print(f"🔄 Vector index synced: {upserted} upserted, {deleted} deleted ({index.ncontent} distinct texts for {index.ntotal} incidents).")
+
+    index.fingerprint = fingerprint
+    index.save(cache_dir)
+    return index, index.embeddings, model
+
+def ingest_incidents(rows, model, index, deleted_ids=(), cache_dir=INDEX_CACHE_DIR):
+    # Apply a batch of new/changed/closed incidents without touching the rest of the corpus
+    upserted = index.upsert(rows, model) if len(rows) else 0
+    deleted = index.delete(list(deleted_ids)) if deleted_ids else 0
+    index.fingerprint = None
+    index.save(cache_dir)
+    return upserted, deleted
+
+def retrieve_similar_incidents_batch(queries, model, index, df, top_k=3, filters=None):
+    # One forward pass for all queries and one FAISS call with the filters pushed down
+    query_embeddings = model.encode(list(queries), batch_size=64, convert_to_numpy=True)
+    keys, distances = index.search(query_embeddings, top_k, filters)
+
+    positions = pd.Index(df["incident_id"]).get_indexer([key for row in keys for key in row])
+    results = []
+    offset = 0
+    for row_keys, row_distances in zip(keys, distances):
+        row_positions = positions[offset:offset + len(row_keys)]
+        offset += len(row_keys)
+        found = row_positions >= 0
+        result = df.iloc[row_positions[found]].copy()
+        result["distance"] = np.array(row_distances, dtype="float32")[found]
+        results.append(result)
+    return results
+
+def retrieve_similar_incidents(query_text, model, index, df, top_k=3, filters=None):
+    return retrieve_similar_incidents_batch([query_text], model, index, df, top_k, filters)[0]
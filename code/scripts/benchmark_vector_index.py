@@ -0,0 +1,102 @@
+# Recall / latency / memory benchmark for the vector index backends.
+#
+#   python scripts/benchmark_vector_index.py --sizes 10000,100000,1000000
+#
+# Synthetic incidents are drawn as noisy points around a few hundred "topic"
+# centroids, which mimics how our incident texts cluster around recurring
+# descriptions and causes. Recall@k is measured against exact IndexFlatL2.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.index_factory import index_memory_bytes, make_faiss_index, make_search_params, train_if_needed
+
+def synthetic_incidents(n, dimension, topics, seed):
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((topics, dimension)).astype("float32")
+    vectors = centroids[rng.integers(0, topics, n)] + 0.35 * rng.standard_normal((n, dimension)).astype("float32")
+    # Sentence-transformer embeddings are unit-normalised
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+def timed_queries(index, queries, top_k, params):
+    latencies = []
+    results = []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], top_k, params=params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(ids[0])
+    return np.array(results), np.array(latencies)
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+def run(size, args):
+    data = synthetic_incidents(size, args.dim, args.topics, seed=size)
+    queries = synthetic_incidents(args.queries, args.dim, args.topics, seed=size)  # same topics as the corpus
+    rows = []
+    truth = None
+
+    for backend in args.backends:
+        config = {"backend": backend, "nlist": args.nlist, "hnsw_m": args.hnsw_m, "pq_m": args.pq_m}
+        start = time.perf_counter()
+        index = make_faiss_index(args.dim, config, n_train=size)
+        train_if_needed(index, data)
+        index.add(data)
+        build_s = time.perf_counter() - start
+        memory_mb = index_memory_bytes(index) / 1e6
+
+        if backend.startswith("ivf"):
+            sweeps = [("nprobe", v) for v in args.nprobe]
+        elif backend == "hnsw":
+            sweeps = [("ef_search", v) for v in args.ef_search]
+        else:
+            sweeps = [("-", None)]
+
+        for knob, value in sweeps:
+            params = make_search_params(index, {**config, knob: value} if value else config)
+            found, latencies = timed_queries(index, queries, args.k, params)
+            if truth is None:
+                truth = found  # the flat backend runs first and is the ground truth
+            rows.append((
+                size, backend, f"{knob}={value}" if value else "exact",
+                recall_at_k(found, truth), np.percentile(latencies, 50), np.percentile(latencies, 99),
+                memory_mb, build_s,
+            ))
+        del index
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS backends for the incident index")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--backends", default="flat,ivf_flat,hnsw,ivf_pq")
+    parser.add_argument("--dim", type=int, default=384)  # all-MiniLM-L6-v2
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", default="8,32")
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-search", default="32,128")
+    parser.add_argument("--pq-m", type=int, default=48)
+    args = parser.parse_args()
+
+    args.backends = ["flat"] + [b for b in args.backends.split(",") if b != "flat"]
+    args.nprobe = [int(v) for v in args.nprobe.split(",")]
+    args.ef_search = [int(v) for v in args.ef_search.split(",")]
+
+    print(f"{'size':>9} {'backend':<9} {'setting':<14} {'recall@' + str(args.k):>9} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'mem MB':>9} {'build s':>8}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        for row in run(size, args):
+            print(f"{row[0]:>9} {row[1]:<9} {row[2]:<14} {row[3]:>9.3f} "
+                  f"{row[4]:>8.3f} {row[5]:>8.3f} {row[6]:>9.1f} {row[7]:>8.1f}")
+
+if __name__ == "__main__":
+    main()
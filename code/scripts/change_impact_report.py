@@ -0,0 +1,31 @@
+# Fleet-wide change impact: which change requests are the strongest suspects for the most incidents.
+#
+#   python scripts/change_impact_report.py --top 20
+#
+# Brings the correlation table up to date with incident_data.csv and change.csv first;
+# only new or edited incidents (and incidents affected by new CRs) are recomputed.
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.change_checker import build_change_index, load_changes
+from app.change_correlation import CorrelationTable
+from app.data_loader import load_incident_data
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank change requests by correlated incidents")
+    parser.add_argument("--incidents", default="data/incident_data.csv")
+    parser.add_argument("--changes", default="data/change.csv")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    table = CorrelationTable()
+    table.update(load_incident_data(args.incidents), build_change_index(load_changes(args.changes)))
+    with pd.option_context("display.max_columns", None, "display.width", 160):
+        print(table.top_changes(args.top).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Checks that the change index and the precomputed correlation table return the same top
+# related CRs, in the same order and with the same correlation status, as the original
+# DataFrame lookup behind the Change Review panel (filter by app and date, then a stable
+# sort by distance in days, first 5).
+#
+#   python scripts/check_change_index.py
+import argparse
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.change_checker import build_change_index, get_related_changes, load_changes
+from app.change_correlation import CorrelationTable
+from app.data_loader import load_incident_data
+
+TOP = 5
+
+def panel_status(days_diff, cr_number, selected_cr):
+    # The Change Review panel's original scoring
+    if selected_cr:
+        return '🔴 Strong correlation' if cr_number == selected_cr else '🟠 Partial correlation'
+    return '🟢 All clear' if days_diff > 3 else ('🟠 Partial correlation' if days_diff > 1 else '🔴 Strong correlation')
+
+def dataframe_top(incident, change_df):
+    incident_date = incident["incident_date"]
+    related = get_related_changes(str(incident["app"]), incident_date, change_df)
+    days = lambda cr: abs((pd.to_datetime(incident_date) - pd.to_datetime(cr["date"])).days)
+    related = sorted(related, key=days)
+    return [(cr["cr_number"], panel_status(days(cr), cr["cr_number"], incident["cr_number"])) for cr in related[:TOP]]
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the change index against the DataFrame lookup")
+    parser.add_argument("--incidents", default="data/incident_data.csv")
+    parser.add_argument("--changes", default="data/change.csv")
+    args = parser.parse_args()
+
+    incidents = load_incident_data(args.incidents)
+    change_df = pd.read_csv(args.changes)
+    change_index = build_change_index(load_changes(args.changes))
+
+    table = CorrelationTable(os.path.join(tempfile.mkdtemp(), "correlations.sqlite"))
+    table.update(incidents, change_index)
+
+    mismatches = 0
+    for _, incident in incidents.iterrows():
+        expected = dataframe_top(incident, change_df)
+        from_index = [cr["cr_number"] for cr in change_index.related(str(incident["app"]), incident["incident_date"])[:TOP]]
+        from_table = [(cr["cr_number"], cr["status"]) for cr in table.related(incident["incident_id"])]
+        if from_index != [cr for cr, _ in expected] or from_table != expected:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"❌ {incident['incident_id']}: expected {expected}, index {from_index}, table {from_table}")
+
+    print(f"{'✅' if not mismatches else '❌'} {len(incidents) - mismatches}/{len(incidents)} incidents match the DataFrame top {TOP}")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Accuracy vs speed of the converted local models against their fp32 PyTorch outputs.
+#
+#   python scripts/check_local_inference.py --models embedder,log_summarizer --backends int8,onnx,onnx-int8
+#   python scripts/check_local_inference.py --remote http://127.0.0.1:8765
+#
+# Inputs come from our own data: incident descriptions for the embedder, trace logs for
+# the summarizers and an RCA-style prompt for the generator. Embeddings are compared by
+# cosine similarity, generated text by unigram F1 against the fp32 output (greedy decoding
+# on both sides, so 1.0 means identical wording). With --remote, each model is also called
+# through a running inference server the way the UI does in IPE_INFERENCE_URL mode (client-side
+# micro-batcher -> /embed or /pipeline -> server-side batcher) and compared the same way.
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app import inference_client, model_registry
+from app.batcher import batched_model
+from app.local_inference import load_local_model
+from app.model_registry import MODEL_SPECS
+
+def sample_inputs(name, n):
+    if MODEL_SPECS[name]["task"] == "sentence-embedding":
+        return pd.read_csv("data/incident_data.csv")["description"].astype(str).head(n).tolist()
+    logs = pd.read_csv("data/Logs_Lookup.csv")
+    traces = [" ".join(group["log"].astype(str)) for _, group in logs.groupby("trace_id", sort=False)]
+    if name == "rca_generator":
+        return [f"Suggest a likely root cause for these symptoms:\n{t}" for t in traces[:n]]
+    return traces[:n]
+
+def run_model(model, task, inputs):
+    latencies = []
+    outputs = []
+    for text in inputs:
+        start = time.perf_counter()
+        if task == "sentence-embedding":
+            outputs.append(model.encode([text], convert_to_numpy=True)[0])
+        elif task == "summarization":
+            outputs.append(model(text, max_length=100, min_length=30, do_sample=False)[0]["summary_text"])
+        else:
+            outputs.append(model(text, max_length=256, do_sample=False)[0]["generated_text"])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return outputs, np.array(latencies)
+
+def unigram_f1(candidate, reference):
+    cand, ref = Counter(candidate.lower().split()), Counter(reference.lower().split())
+    overlap = sum((cand & ref).values())
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / sum(cand.values()), overlap / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+def agreement(task, outputs, reference):
+    if task == "sentence-embedding":
+        a, b = np.stack(outputs), np.stack(reference)
+        return float(np.mean(np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))))
+    return float(np.mean([unigram_f1(o, r) for o, r in zip(outputs, reference)]))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare int8 / ONNX Runtime local models against fp32 PyTorch")
+    parser.add_argument("--models", default="embedder,log_summarizer,doc_summarizer,rca_generator")
+    parser.add_argument("--backends", default="int8,onnx,onnx-int8")
+    parser.add_argument("--samples", type=int, default=8)
+    parser.add_argument("--remote", default="", help="inference server URL to round-trip through as well")
+    args = parser.parse_args()
+    if args.remote:
+        # Only get_model() goes remote; the local backends below are loaded directly
+        inference_client.INFERENCE_URL = model_registry.REMOTE_URL = args.remote.rstrip("/")
+
+    print(f"{'model':<15} {'backend':<10} {'agreement':>9} {'p50 ms':>9} {'mean ms':>9} {'speedup':>8} {'load s':>7}")
+    for name in [m for m in args.models.split(",") if m]:
+        spec = MODEL_SPECS[name]
+        inputs = sample_inputs(name, args.samples)
+        reference, baseline = None, None
+        backends = ["torch"] + [b for b in args.backends.split(",") if b and b != "torch"]
+        for backend in backends + (["remote"] if args.remote else []):
+            start = time.perf_counter()
+            try:
+                # No fp32 fallback here, or torch numbers would be reported under the backend's name
+                model = batched_model(name) if backend == "remote" else load_local_model(spec, backend=backend, fallback=False)
+                load_s = time.perf_counter() - start
+                run_model(model, spec["task"], inputs[:1])  # warm-up, not timed
+            except Exception as e:
+                print(f"{name:<15} {backend:<10} unavailable: {e}")
+                continue
+            outputs, latencies = run_model(model, spec["task"], inputs)
+            if reference is None:
+                reference, baseline = outputs, latencies.mean()
+            print(f"{name:<15} {backend:<10} {agreement(spec['task'], outputs, reference):>9.3f} "
+                  f"{np.percentile(latencies, 50):>9.1f} {latencies.mean():>9.1f} "
+                  f"{baseline / latencies.mean():>7.2f}x {load_s:>7.1f}")
+            del model
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# Pre-summarizes the logs of every trace referenced by the incident data, so opening an
+# incident (Logs Check panel, TraceIQ, chatbot) shows its log summary straight from the cache.
+#
+#   python scripts/precompute_log_summaries.py --workers 16
+#
+# Traces are submitted from a thread pool; the summarizer's micro-batcher coalesces them
+# into batched pipeline calls. Traces whose summary is already cached are skipped.
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from app.batcher import MAX_BATCH_SIZE, batcher_stats
+from app.log_checker import cached_log_summary, get_logs_for_trace_id, load_logs, summarize_logs
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute and cache per-trace log summaries")
+    parser.add_argument("--incidents", default="data/incident_data.csv")
+    parser.add_argument("--logs", default="data/Logs_Lookup.csv")
+    parser.add_argument("--workers", type=int, default=MAX_BATCH_SIZE)
+    args = parser.parse_args()
+
+    trace_ids = pd.read_csv(args.incidents, usecols=["trace_id"])["trace_id"].dropna().astype(str).unique()
+    store = load_logs(args.logs)
+    pending = {}
+    for trace_id in trace_ids:
+        lines = get_logs_for_trace_id(trace_id, store)
+        if lines and cached_log_summary(lines, trace_id) is None:
+            pending[trace_id] = lines
+    print(f"🧾 {len(trace_ids)} traces referenced, {len(pending)} need a summary")
+
+    start = time.perf_counter()
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+        futures = {pool.submit(summarize_logs, lines, trace_id): trace_id for trace_id, lines in pending.items()}
+        for future in as_completed(futures):
+            result = future.result() if future.exception() is None else None
+            if isinstance(result, list):
+                done += 1
+            else:
+                failed += 1
+                print(f"⚠️ {futures[future]}: {future.exception() or result}")
+            if (done + failed) % 50 == 0:
+                print(f"  {done + failed}/{len(pending)} traces")
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Summarized {done} traces in {elapsed:.1f}s ({done / elapsed if elapsed else 0:.1f} traces/s), {failed} failed")
+    print(f"📦 Batching: {batcher_stats()}")
+
+if __name__ == "__main__":
+    main()
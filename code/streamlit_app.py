@@ -2,14 +2,16 @@ import torch
 import types
 import streamlit as st
 import json
-import pandas as pd
-from app.data_loader import load_incident_data
+import os
+from app.data_manager import DataManager
 from app.vector_search import build_vector_index, retrieve_similar_incidents
-from app.model_runner import generate_root_cause_analysis,generate_genai_response,describe_network,suggest_missing_connections,answer_rca_question
-from app.change_checker import get_related_changes, load_changes, load_cmdb
+from app.model_runner import backend_health, gather_network_insights, response_cache_stats, stream_root_cause_analysis
 from app.log_checker import get_logs_for_trace_id, load_logs, summarize_logs
 from app.network_viz import generate_dot
 from app.intelscope import save_to_knowledgebase, summarize_entry, query_entry
+from app.model_registry import configured_warm_up
+from app.batcher import batched_model
+from app.inference_client import RemoteIncidentIndex, remote_inference_enabled
 import docx2txt
 from PyPDF2 import PdfReader
 
@@ -36,17 +38,60 @@ torch.classes.__path__ = types.SimpleNamespace(_path=[])
 st.set_page_config(page_title="Integrated Platform Environment (IPE) Analyzer", layout="wide")
 st.title("🔎 IPE - Integrated Platform Environment")
 # --- Load Data ---
-data_path = "data/incident_data.csv"
-df = load_incident_data(data_path)
-index, embeddings, model = build_vector_index(df)
-cmdb_df = load_cmdb("data/CMDB_Mapping.csv")
-change_df = load_changes("data/change.csv")
-logs_df = load_logs("data/Logs_Lookup.csv")
-network_df = pd.read_csv("data/network_metadata.csv")
-import ast
-network_df["api_flows"] = network_df["api_flows"].apply(ast.literal_eval)
-
-network_data = network_df.to_dict(orient="records")
+# Models load lazily on first use; optionally start loading some in the background once per process
+@st.cache_resource
+def start_model_warm_up():
+    return None if remote_inference_enabled() else configured_warm_up()
+
+start_model_warm_up()
+
+def load_vector_index(df):
+    if remote_inference_enabled():
+        # Shared inference server holds the warm index and models; it re-reads its own copy of the
+        # incident CSV, so its index follows the data but isn't versioned with our snapshot
+        index = RemoteIncidentIndex()
+        index.reload()
+        return index, None, batched_model("embedder")
+    return build_vector_index(df)
+
+# Incidents, changes, CMDB and topology with their indexes, shared across reruns. Changed files under
+# data/ are picked up in the background (IPE_DATA_WATCH_SECONDS, 0 disables) and swapped in as a new
+# snapshot; each rerun works off the snapshot it started with.
+@st.cache_resource(show_spinner="Loading incident data and index...")
+def get_data_manager():
+    manager = DataManager(index_builder=load_vector_index)
+    manager.start_watching(float(os.getenv("IPE_DATA_WATCH_SECONDS", "10")))
+    return manager
+
+data_manager = get_data_manager()
+snapshot = data_manager.snapshot()
+df = snapshot.incidents
+index, embeddings, model = snapshot.index, snapshot.embeddings, snapshot.model
+cmdb_df = snapshot.cmdb
+change_index = snapshot.change_index
+correlation_table = snapshot.correlations
+entities = snapshot.entities
+network_data = snapshot.network
+
+# Memory-mapped trace log store, shared across reruns and kept current by a background tail
+# (IPE_LOG_TAIL_SECONDS, 0 disables)
+@st.cache_resource(show_spinner="Loading trace logs...")
+def get_log_store(logs_path):
+    store = load_logs(logs_path)
+    store.start_tailing(float(os.getenv("IPE_LOG_TAIL_SECONDS", "5")))
+    return store
+
+logs_df = get_log_store("data/Logs_Lookup.csv")
+
+# GenAI runs in this process: OpenAI circuit state, how often answers came from the LaMini fallback
+# and how often the response cache answered instead
+with st.sidebar.expander("🩺 GenAI backend status"):
+    health = backend_health()
+    st.caption(f"OpenAI circuit: **{health['circuit']}** · {health['fallbacks']} fallbacks · {health['hedges']} hedges")
+    st.json(health)
+    cache = response_cache_stats()
+    st.caption(f"Response cache: {cache['entries']} answers · {cache['hit_rate']:.0%} hit rate")
+    st.json(cache)
 
 # --- Card Selection ---
 # st.markdown("##")
@@ -255,30 +300,34 @@ st.divider()
 if st.session_state.active_card == "smart":
     st.subheader("🧠 Smart Issue Explorer")
     query = st.text_input("Enter issue or symptom description:")
+    app_filter = st.multiselect("Optional: Only match incidents from these apps", sorted(df["app"].unique()))
 
     if query:
-        incident_row = df[df["incident_id"] == query]
+        incident_row = entities.incident(query)
         query_text = (
-            incident_row.iloc[0]["combined_text"] if not incident_row.empty else query
+            incident_row["combined_text"] if incident_row is not None else query
         )
 
         with st.spinner("Retrieving similar incidents..."):
-            similar = retrieve_similar_incidents(query_text, model, index, df)
+            filters = {"app": app_filter} if app_filter else None
+            similar = retrieve_similar_incidents(query_text, model, index, df, filters=filters)
             st.dataframe(similar[["incident_id", "description", "resolution", "cause"]])
         
         st.markdown('<div class="small-button">', unsafe_allow_html=True)
-        if st.button("Analyze"):
-            st.session_state.rca_text_source = query_text
-            st.session_state.rca_similar_data = similar
-            with st.spinner("Generating Root Cause Analysis..."):
-                st.session_state.rca_result = generate_root_cause_analysis(
-                    st.session_state.rca_text_source,
-                    st.session_state.rca_similar_data
-                )
+        analyze = st.button("Analyze")
         st.markdown('</div>', unsafe_allow_html=True)
 
+        if analyze:
+            st.session_state.rca_text_source = query_text
+            st.session_state.rca_similar_data = similar
+            st.markdown("### 🧠 Probable Root Cause and Resolution")
+            # Render tokens as they arrive instead of waiting for the whole answer
+            st.session_state.rca_result = st.write_stream(stream_root_cause_analysis(
+                st.session_state.rca_text_source,
+                st.session_state.rca_similar_data
+            ))
         # Show RCA if previously generated
-        if "rca_result" in st.session_state and st.session_state.active_card == "smart":
+        elif "rca_result" in st.session_state and st.session_state.active_card == "smart":
             st.markdown("### 🧠 Probable Root Cause and Resolution")
             st.markdown(st.session_state.rca_result)
         st.markdown("---")  # adds a horizontal line
@@ -336,11 +385,13 @@ elif st.session_state.active_card == "tracer":
     st.subheader("🧬 TraceIQ")
 
     trace_input = st.text_input("Enter Trace ID to investigate:")
-    selected_app = st.selectbox("Optional: Select the App related to this Trace ID (for better context)", [""] + sorted(cmdb_df["app"].unique()))
+    ingest = logs_df.stats()
+    st.caption(f"📥 {ingest['lines']:,} log lines indexed · {ingest['lines_per_second']:,.0f} lines/s last ingest · lag {ingest['lag_seconds']}s")
+    selected_app = st.selectbox("Optional: Select the App related to this Trace ID (for better context)", [""] + entities.cmdb_apps)
 
     if trace_input:
         if selected_app:
-            data_sources = cmdb_df[cmdb_df["app"] == selected_app]["data_source"].unique()
+            data_sources = entities.data_sources_for_app(selected_app)
             source_display = ", ".join(data_sources)
             st.markdown(f"ℹ️ Gathering logs from **{source_display}**...")
             logs = get_logs_for_trace_id(trace_input, logs_df)
@@ -350,7 +401,7 @@ elif st.session_state.active_card == "tracer":
 
         if logs:
             st.markdown(f"**🧠 Log Summary for Trace ID: `{trace_input}`**")
-            summary = summarize_logs(logs)
+            summary = summarize_logs(logs, trace_input)
             for line in summary:
                 clean_line = line.strip("•○–- ").strip()
                 st.markdown(f"- {clean_line}")
@@ -370,24 +421,23 @@ elif st.session_state.active_card == "netviz":
     with st.expander("💬 Ask GenAI about this network"):
         st.markdown("You can ask for descriptions, RCA insights, or suggest improvements.")
         nl_query = st.text_input("Enter a question (e.g., 'Why would SGA fail if EFG is down?')", key="genai_network_q")
+        answer_slot = st.empty()
 
-        if nl_query.strip():
-            with st.spinner("Thinking..."):
-                result = answer_rca_question(nl_query.strip(), selected_app, network_data)
-                st.markdown(result)
+    description_panel = st.expander("📄 Auto Description")
+    suggestions_panel = st.expander("🧩 Suggest Missing Connections")
 
-    with st.expander("📄 Auto Description"):
-        # if st.button("Generate Description"):
-        with st.spinner("Describing..."):
-            st.session_state.auto_description = describe_network(selected_app, network_data)
-        if "auto_description" in st.session_state:
-            st.markdown(st.session_state.auto_description)
+    # All three prompts go out concurrently
+    with st.spinner("Thinking..."):
+        insights = gather_network_insights(selected_app, network_data, nl_query.strip() or None)
+    st.session_state.auto_description = insights["description"]
+    st.session_state.suggestions = insights["suggestions"]
 
-    with st.expander("🧩 Suggest Missing Connections"):
-        with st.spinner("Thinking..."):
-            st.session_state.suggestions = suggest_missing_connections(selected_app, network_data)
-        if "suggestions" in st.session_state:
-            st.markdown(st.session_state.suggestions)
+    if insights["answer"]:
+        answer_slot.markdown(insights["answer"])
+    with description_panel:
+        st.markdown(st.session_state.auto_description)
+    with suggestions_panel:
+        st.markdown(st.session_state.suggestions)
 
 # --- Shared RCA Panels ---
 if "incident_selected" in st.session_state:
@@ -403,32 +453,13 @@ if "incident_selected" in st.session_state:
 
     with st.expander("🔁 Change Review (CR)", expanded=False):
         st.write("Looking for related Change Requests...")
-        app = incident['app']
-        incident_date = incident['incident_date']
-        related_crs = get_related_changes(app, incident_date, change_df)
-
-        def correlation_weight(cr_date):
-            try:
-                return abs((pd.to_datetime(incident_date) - pd.to_datetime(cr_date)).days)
-            except:
-                return 999
+        # Precomputed: the nearest prior CRs with their correlation status
+        related_crs = correlation_table.related(incident['incident_id'])
 
         if related_crs:
-            related_crs = sorted(related_crs, key=lambda x: correlation_weight(x["date"]))
-            top_related = related_crs[:5]
-            selected_cr = incident.get('cr_number', '')
-
-            for cr in top_related:
-                cr_date = pd.to_datetime(cr["date"])
-                inc_date = pd.to_datetime(incident_date)
-                days_diff = abs((inc_date - cr_date).days)
-
-                if selected_cr:
-                    status = '🔴 Strong correlation' if cr['cr_number'] == selected_cr else '🟠 Partial correlation'
-                else:
-                    status = '🟢 All clear' if days_diff > 3 else ('🟠 Partial correlation' if days_diff > 1 else '🔴 Strong correlation')
-
-                ci_list = cmdb_df[cmdb_df["app"] == cr["app"]]["ci_id"].tolist()
+            for cr in related_crs:
+                status = cr["status"]
+                ci_list = entities.cis_for_app(cr["app"])
                 ci_text = ", ".join(ci_list)
                 app_name = cr["app"]
 
@@ -449,7 +480,7 @@ if "incident_selected" in st.session_state:
             logs = get_logs_for_trace_id(trace_id, logs_df)
             if logs:
                 st.markdown(f"**🧠 Log Summary for Trace ID: `{trace_id}`**")
-                summary = summarize_logs(logs)
+                summary = summarize_logs(logs, trace_id)
                 for line in summary:
                     clean_line = line.strip("•○–- ").strip()
                     st.markdown(f"- {clean_line}")
@@ -525,14 +556,21 @@ if st.session_state.show_chatbot:
                     model=model,
                     index=index,
                     logs_df=logs_df,
-                    change_df=change_df,
+                    change_df=change_index,
+                    correlations=correlation_table,
                     cmdb_df=cmdb_df,
                     network_data=network_data,
+                    entities=entities,
                     chat_history=st.session_state.chat_history,
-                    kb_doc_id=st.session_state.get("last_uploaded_doc_id")
+                    kb_doc_id=st.session_state.get("last_uploaded_doc_id"),
+                    stream=True
                 )
-                st.session_state.chat_history.append({"role": "bot", "content": chat_result})
-
-                # Clear the widget by triggering a rerun with the same key but no value
-                del st.session_state["chat_mia_input"]
-                st.rerun()
\ No newline at end of file
+            if isinstance(chat_result, types.GeneratorType):
+                # GenAI answers arrive as a token stream; show them live, keep the full text in history
+                st.markdown("<div class='chat-entry'><strong>🕵️‍♀️:</strong></div>", unsafe_allow_html=True)
+                chat_result = st.write_stream(chat_result)
+            st.session_state.chat_history.append({"role": "bot", "content": chat_result})
+
+            # Clear the widget by triggering a rerun with the same key but no value
+            del st.session_state["chat_mia_input"]
+            st.rerun()
\ No newline at end of file